@@ -0,0 +1,237 @@
+from datetime import datetime
+
+from flask import Blueprint, abort, jsonify, request
+from sqlalchemy.orm import joinedload, load_only
+from werkzeug.exceptions import HTTPException
+
+from cursors import keyset_paginate
+from database import read_only
+from models import db, ArticleModel, CommentModel, LikeModel, UserModel
+from pagecache import cached_page
+from render import rendered_html
+from tags import parse_tags, tag_filter
+
+# JSON API только для чтения: /api/v1/...
+# ?fields=title,excerpt - какие поля вернуть, из базы читаются только нужные
+# колонки (content в списках не грузится никогда); ?ids=1,2,3 - пачка объектов
+# одним запросом; ?cursor= - keyset пагинация. Ответы с ETag, If-None-Match -> 304.
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_BATCH = 100
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# поле -> колонки модели, которые для него нужны
+ARTICLE_FIELDS = {
+    'id': ('id',),
+    'title': ('title',),
+    'excerpt': ('excerpt',),
+    'category': ('category',),
+    'tags': ('tags',),
+    'image': ('articles_img', 'img_variants'),
+    'author_id': ('author_id',),
+    'like_count': ('like_count',),
+    'comment_count': ('comment_count',),
+    'views': ('views',),
+    'created_at': ('created_at',),
+    'updated_at': ('updated_at',),
+}
+# Текст статьи - только в /articles/<id>
+ARTICLE_DETAIL_FIELDS = {**ARTICLE_FIELDS, 'content_html': ('content_html', 'render_version')}
+USER_FIELDS = {
+    'id': ('id',),
+    'username': ('username',),
+    'avatar': ('avatar', 'avatar_variants'),
+    'follower_count': ('follower_count',),
+}
+COMMENT_FIELDS = ('id', 'content', 'created_at', 'user_id', 'author')
+LIKE_FIELDS = ('id', 'user_id', 'created_at')
+
+
+@api.errorhandler(HTTPException)
+def _json_error(e):
+    return jsonify(error=e.description, status=e.code), e.code
+
+
+@api.after_request
+def _conditional(response):
+    # cached_page уже ставит ETag; без кэша считаем его по телу ответа
+    if request.method == 'GET' and response.status_code == 200 and not response.get_etag()[0]:
+        response.add_etag()
+        response.headers['Cache-Control'] = 'public, no-cache'
+        response = response.make_conditional(request)
+    return response
+
+
+def _value(obj, name):
+    if name == 'image':
+        return obj.get_image_url('card')
+    if name == 'avatar':
+        return obj.get_avatar_url('thumb')
+    if name == 'tags':
+        return parse_tags(obj.tags)
+    if name == 'content_html':
+        return rendered_html(obj)
+    if name == 'author':
+        return obj.user.username
+    value = getattr(obj, name)
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _serialize(obj, fields):
+    return {name: _value(obj, name) for name in fields}
+
+
+def _requested_fields(allowed):
+    """Поля из ?fields= (id возвращается всегда); без параметра - все разрешённые."""
+    spec = request.args.get('fields')
+    if not spec:
+        return list(allowed)
+    names = [name.strip() for name in spec.split(',') if name.strip()]
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        abort(400, description=f'Неизвестные поля: {", ".join(unknown)}')
+    return ['id'] + [name for name in dict.fromkeys(names) if name != 'id']
+
+
+def _load_only(model, spec, fields):
+    columns = {column for name in fields for column in spec[name]}
+    return load_only(*[getattr(model, column) for column in sorted(columns)])
+
+
+def _limit():
+    try:
+        limit = int(request.args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        abort(400, description='limit должен быть числом')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def _batch_ids():
+    """Список id из ?ids=1,2,3 (без повторов, порядок сохраняется) или None."""
+    value = request.args.get('ids')
+    if value is None:
+        return None
+    try:
+        ids = list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+    except ValueError:
+        abort(400, description='ids - список чисел через запятую')
+    if not ids or len(ids) > MAX_BATCH:
+        abort(400, description=f'ids: от 1 до {MAX_BATCH} значений')
+    return ids
+
+
+def _batch_response(model, stmt, ids, fields):
+    found = {obj.id: obj for obj in db.session.execute(stmt.where(model.id.in_(ids))).scalars()}
+    return jsonify(
+        data=[_serialize(found[i], fields) for i in ids if i in found],
+        missing=[i for i in ids if i not in found],
+    )
+
+
+def _page_response(page, fields):
+    return jsonify(
+        data=[_serialize(obj, fields) for obj in page.items],
+        next_cursor=page.next_cursor,
+        prev_cursor=page.prev_cursor,
+    )
+
+
+def _published_article_id(id):
+    if db.session.execute(db.select(ArticleModel.id).filter_by(id=id, status='published')).scalar() is None:
+        abort(404, description='Статья не найдена')
+
+
+@api.route('/articles')
+@read_only
+@cached_page('listings', 'users', public=True)
+def articles():
+    fields = _requested_fields(ARTICLE_FIELDS)
+    stmt = (
+        db.select(ArticleModel)
+        .options(_load_only(ArticleModel, ARTICLE_FIELDS, fields))
+        .where(ArticleModel.status == 'published')
+    )
+    ids = _batch_ids()
+    if ids is not None:
+        return _batch_response(ArticleModel, stmt, ids, fields)
+
+    if request.args.get('category'):
+        stmt = stmt.where(ArticleModel.category == request.args['category'])
+    if request.args.get('author_id'):
+        stmt = stmt.where(ArticleModel.author_id == request.args.get('author_id', type=int))
+    if request.args.get('tag'):
+        stmt = stmt.where(tag_filter(request.args['tag']))
+    page = keyset_paginate(stmt, [ArticleModel.created_at, ArticleModel.id],
+                           request.args.get('cursor'), _limit())
+    return _page_response(page, fields)
+
+
+@api.route('/articles/<int:id>')
+@read_only
+@cached_page(lambda id: f'article:{id}', 'users', public=True)
+def article(id):
+    fields = _requested_fields(ARTICLE_DETAIL_FIELDS)
+    obj = db.session.execute(
+        db.select(ArticleModel)
+        .options(_load_only(ArticleModel, ARTICLE_DETAIL_FIELDS, fields))
+        .filter_by(id=id, status='published')
+    ).scalar()
+    if obj is None:
+        abort(404, description='Статья не найдена')
+    return jsonify(data=_serialize(obj, fields))
+
+
+@api.route('/articles/<int:id>/comments')
+@read_only
+@cached_page(lambda id: f'article:{id}', 'users', public=True)
+def article_comments(id):
+    _published_article_id(id)
+    stmt = (
+        db.select(CommentModel)
+        .options(joinedload(CommentModel.user).load_only(UserModel.username))
+        .where(CommentModel.article_id == id)
+    )
+    page = keyset_paginate(stmt, [CommentModel.created_at, CommentModel.id], request.args.get('cursor'), _limit())
+    return _page_response(page, COMMENT_FIELDS)
+
+
+@api.route('/articles/<int:id>/likes')
+@read_only
+@cached_page(lambda id: f'article:{id}', public=True)
+def article_likes(id):
+    _published_article_id(id)
+    stmt = (
+        db.select(LikeModel)
+        .options(load_only(LikeModel.user_id, LikeModel.created_at))
+        .where(LikeModel.article_id == id)
+    )
+    page = keyset_paginate(stmt, [LikeModel.id], request.args.get('cursor'), _limit())
+    return _page_response(page, LIKE_FIELDS)
+
+
+@api.route('/users')
+@read_only
+@cached_page('users', public=True)
+def users():
+    fields = _requested_fields(USER_FIELDS)
+    stmt = db.select(UserModel).options(_load_only(UserModel, USER_FIELDS, fields))
+    # Списка всех пользователей нет - только авторы по id из /articles
+    ids = _batch_ids()
+    if ids is None:
+        abort(400, description='Укажите ids')
+    return _batch_response(UserModel, stmt, ids, fields)
+
+
+@api.route('/users/<int:id>')
+@read_only
+@cached_page('users', public=True)
+def user(id):
+    fields = _requested_fields(USER_FIELDS)
+    obj = db.session.execute(
+        db.select(UserModel).options(_load_only(UserModel, USER_FIELDS, fields)).filter_by(id=id)
+    ).scalar()
+    if obj is None:
+        abort(404, description='Пользователь не найден')
+    return jsonify(data=_serialize(obj, fields))
@@ -1,146 +1,197 @@
-from flask import Flask, redirect, request, render_template, url_for, flash, session
+from flask import Flask, Blueprint, current_app, redirect, request, render_template, url_for, flash, session, abort, send_from_directory
 from models import db, UserModel, ArticleModel, CommentModel, LikeModel
+from search import search_articles, ensure_search_index
+from stats import get_author_stats
+from cursors import keyset_paginate
+from comments import load_comments
+from sqlprofile import init_sql_profiler
+from pagecache import page_cache, cached_page
+from images import schedule_variants
+from storage import save_upload, release_upload, HASHED_NAME
+from passwords import PasswordHasherBusy
+from viewcounter import view_counter, counts_view
+from currentuser import user_cache, current_user
+from assets import assets
+from trending import trending, trending_articles
+import timeline
+from database import configure_database, init_sqlite_pragmas, read_only
+from config import config
+from queryplans import check_query_plans
+from bulkio import MODELS as BULK_MODELS, BulkImportError, import_jsonl, export_jsonl
+from feeds import feed_articles, feed_response
+from api import api
+from render import render_article, rendered_html, rerender_stale
+from tags import update_article_tags, remove_article_tags, popular_tags, rebuild_tags, normalize_tag
+from benchmark import generate_dataset, run_benchmark, format_report, save_report, load_report
 from flask_migrate import Migrate
-from flask_bcrypt import Bcrypt
 from datetime import datetime
-from flask_sqlalchemy import pagination
 from datetime import time
 from werkzeug.utils import secure_filename
+from sqlalchemy.orm import joinedload, defer, selectinload
+import click
 import os
 
-app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = 'static/uploads/avatars'
-app.config['ARTICLE_UPLOAD_FOLDER'] = 'static/uploads/articles'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(app.config['ARTICLE_UPLOAD_FOLDER'], exist_ok=True) 
-
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db'
-app.secret_key = 'your_secret_key'
-bcrypt = Bcrypt(app)
-db.init_app(app)
-migrate = Migrate(app, db)
+# Все страницы и CLI команды - в blueprint'е main, приложение собирает create_app
+main = Blueprint('main', __name__, cli_group=None)
+migrate = Migrate()
+
+
+def create_app(config_name=None):
+    """Фабрика приложения. Конфиг выбирается через FLASK_CONFIG: development / production / testing."""
+    app = Flask(__name__)
+    app.config.from_object(config[config_name or os.environ.get('FLASK_CONFIG', 'default')])
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    os.makedirs(app.config['ARTICLE_UPLOAD_FOLDER'], exist_ok=True)
+
+    configure_database(app)
+    db.init_app(app)
+    init_sqlite_pragmas(app, db)
+    migrate.init_app(app, db)
+    init_sql_profiler(app)
+    page_cache.init_app(app)
+    # trending раньше view_counter: при выходе сначала сбросятся просмотры, потом пересчёт трендов
+    trending.init_app(app)
+    view_counter.init_app(app)
+    user_cache.init_app(app)
+    assets.init_app(app)
+    app.register_blueprint(main)
+    app.register_blueprint(api)
+    return app
+
+# Пул хэширования паролей переполнен - просим повторить позже
+@main.app_errorhandler(PasswordHasherBusy)
+def password_hasher_busy(e):
+    return 'Сервер перегружен, попробуйте войти через несколько секунд.', 503, {'Retry-After': '5'}
 
 # Настройка логина 
 def login_required(f):
     from functools import wraps
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        # Пользователя могли удалить, а сессия осталась
+        if current_user() is None:
+            session.pop('user_id', None)
             flash('Вам нужно войти в систему!')
-            return redirect(url_for('sign_in_page'))
+            return redirect(url_for('main.sign_in_page'))
         return f(*args, **kwargs)
     return decorated_function
 
 # URL's и View's 
 
 # base.html если не зареган 
-@app.route('/', methods=['GET', 'POST'])
+@main.route('/', methods=['GET', 'POST'])
 def home_page():
     if 'user_id' in session:  
-        return redirect(url_for('home_page_logged'))
+        return redirect(url_for('main.home_page_logged'))
     else:
         return render_template('base.html')
 
 
 # После регистрации 
-@app.route('/home', methods=['GET', 'POST'])
+@main.route('/home', methods=['GET', 'POST'])
 @login_required
+@cached_page('listings', 'users')
 def home_page_logged():
-    user = UserModel.query.get(session['user_id'])
-    session['username'] = user.username
-    recent_articles = ArticleModel.query.filter_by(author_id=session['user_id']).order_by(ArticleModel.created_at.desc()).limit(5).all()
-    all_articles = ArticleModel.query.filter_by(author_id=session['user_id']).all()
-    stats = {
-        'total_articles': len(all_articles),
-        'published_articles': len([a for a in all_articles if a.status == 'published']),
-        'draft_articles': len([a for a in all_articles if a.status == 'draft']),
-        'total_views': 0
-    }
+    recent_articles = ArticleModel.query.options(defer(ArticleModel.content)).filter_by(author_id=session['user_id']).order_by(ArticleModel.created_at.desc()).limit(5).all()
+    stats = get_author_stats(session['user_id'])
     # Поиск
     query = request.args.get('q', '').strip()
     category = request.args.get('category', '')
     articles = []
     total_results = 0
     if query or category:
-        search_query = ArticleModel.query.filter_by(status='published')
-        if query:
-            search_query = search_query.filter(
-                ArticleModel.title.contains(query) |
-                ArticleModel.content.contains(query) |
-                ArticleModel.tags.contains(query)
-            )
-        if category:
-            search_query = search_query.filter_by(category=category)
-        page = request.args.get('page', 1, type=int)
-        pagination = search_query.paginate(page=page, per_page=10, error_out=False)
+        cursor = request.args.get('cursor')
+        pagination = search_articles(query, category, request.args.get('sort'), cursor=cursor)
         articles = pagination.items
         total_results = pagination.total
+        feed = None
     else:
         pagination = None
+        feed = timeline.home_timeline(current_app._get_current_object(), session['user_id'], request.args.get('feed_cursor'))
     recent_activities = [] 
     return render_template('home_page_logged.html',
                            recent_articles=recent_articles,
                            stats=stats,
+                           feed=feed,
                            articles=articles,
                            query=query,
                            category=category,
                            total_results=total_results,
                            pagination=pagination,
                            recent_activities=recent_activities)
+# Профиль другого пользователя и подписки
+@main.route('/user/<int:id>')
+@read_only
+@cached_page('listings', 'users')
+def user_page(id):
+    if session.get('user_id') == id:
+        return redirect(url_for('main.profile_page'))
+    user = db.get_or_404(UserModel, id)
+    articles = (ArticleModel.query.options(defer(ArticleModel.content))
+                .filter_by(author_id=id, status='published')
+                .order_by(ArticleModel.created_at.desc()).limit(10).all())
+    return render_template('profile_of_others_users.html', user=user, articles=articles,
+                           stats=get_author_stats(id),
+                           following=timeline.is_following(session.get('user_id'), id),
+                           following_count=timeline.following_count(id))
+
+@main.route('/user/<int:id>/follow', methods=['POST'])
+@login_required
+def follow_user(id):
+    user = db.get_or_404(UserModel, id)
+    if timeline.follow(current_app._get_current_object(), session['user_id'], id):
+        page_cache.invalidate('users')
+        flash(f'Вы подписались на {user.username}')
+    return redirect(url_for('main.user_page', id=id))
+
+@main.route('/user/<int:id>/unfollow', methods=['POST'])
+@login_required
+def unfollow_user(id):
+    user = db.get_or_404(UserModel, id)
+    if timeline.unfollow(current_app._get_current_object(), session['user_id'], id):
+        page_cache.invalidate('users')
+        flash(f'Вы отписались от {user.username}')
+    return redirect(url_for('main.user_page', id=id))
+
 # О нас (осталное потом :) )
-@app.route('/about')
+@main.route('/about')
 def about_us():
     recent_activities = [] 
     return render_template('about.html', recent_activities=recent_activities)
 
 
-@app.route('/profile', methods=['GET', 'POST'])
+@main.route('/profile', methods=['GET', 'POST'])
 @login_required
 def profile_page():
     user = UserModel.query.get(session['user_id'])
     if not user:
         flash('User not found')
-        return redirect(url_for('sign_in_page'))  # Changed from 'login' to 'sign_in_page'
+        return redirect(url_for('main.sign_in_page'))  # Changed from 'login' to 'sign_in_page'
     
-    articles = ArticleModel.query.filter_by(author_id=user.id).all()
-    stats = {
-        'total_articles': len(articles),
-        'published_articles': len([a for a in articles if a.status == 'published']),
-        'draft_articles': len([a for a in articles if a.status == 'draft']),
-        'total_views': sum(getattr(a, 'views', 0) for a in articles)
-    }
-    recent_articles = ArticleModel.query.filter_by(author_id=user.id).order_by(ArticleModel.created_at.desc()).limit(5).all()
+    stats = get_author_stats(user.id)
+    recent_articles = ArticleModel.query.options(defer(ArticleModel.content)).filter_by(author_id=user.id).order_by(ArticleModel.created_at.desc()).limit(5).all()
     
     if request.method == 'POST':
         username = request.form.get('username', user.username)
         email = request.form.get('email', user.email)
         age_str = request.form.get('age')
         age = int(age_str) if age_str and age_str.isdigit() else user.age
+        old_avatar = None
         
         avatar_file = request.files.get('avatar')
         if avatar_file and avatar_file.filename:
             if allowed_file(avatar_file.filename):
                 filename = secure_filename(avatar_file.filename)
                 ext = filename.rsplit('.', 1)[1] if '.' in filename else ''
-                new_filename = f'avatar_{user.id}_{int(datetime.now().timestamp())}.{ext}'  # Fixed time import
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], new_filename)
-                avatar_file.save(file_path)
-                
-                if user.avatar and user.avatar != 'default.png':
-                    old_avatar_path = os.path.join('static/uploads/avatars', user.avatar.split('/')[-1])
-                    if os.path.exists(old_avatar_path):
-                        try:
-                            os.remove(old_avatar_path)
-                        except OSError:
-                            pass
-                
+                new_filename = save_upload(avatar_file, current_app.config['UPLOAD_FOLDER'], ext)
+                old_avatar = user.avatar
                 user.avatar = new_filename  
+                user.avatar_variants = None
             else: 
                 flash('Неправильное расширение, допустимые расширения: PNG, JPG, JPEG, GIF')
                 return render_template('user_profile.html', user=user, stats=stats, recent_articles=recent_articles, recent_activities=[])
@@ -151,9 +202,14 @@ def profile_page():
         
         try:
             db.session.commit()
-            session['username'] = user.username
+            page_cache.invalidate('users')
+            user_cache.invalidate(user.id)
+            if old_avatar != user.avatar:
+                release_upload(current_app.config['UPLOAD_FOLDER'], old_avatar, UserModel.avatar)
+            if avatar_file and avatar_file.filename:
+                schedule_variants(current_app._get_current_object(), 'avatar', user.id, user.avatar)
             flash('Профиль успешно обновлен!')
-            return redirect(url_for('profile_page'))
+            return redirect(url_for('main.profile_page'))
         except Exception as e:
             db.session.rollback()
             flash(f'Ошибка при обновлении профиля: {str(e)}')
@@ -161,32 +217,35 @@ def profile_page():
     recent_activities = []
     return render_template('user_profile.html', user=user, stats=stats, recent_articles=recent_articles, recent_activities=recent_activities)
 
-# Поиск
-@app.route('/search', methods=['GET'])
-def search():
+# Загруженные картинки. Имена по хэшу содержимого не меняются - кэшируем навсегда
+UPLOAD_FOLDERS = {'avatars': 'UPLOAD_FOLDER', 'articles': 'ARTICLE_UPLOAD_FOLDER'}
+
+@main.route('/uploads/<kind>/<path:filename>')
+def uploaded_file(kind, filename):
+    if kind not in UPLOAD_FOLDERS:
+        abort(404)
+    folder = os.path.join(current_app.root_path, current_app.config[UPLOAD_FOLDERS[kind]])
+    if HASHED_NAME.match(filename):
+        response = send_from_directory(folder, filename, max_age=365 * 24 * 3600)
+        response.headers['Cache-Control'] += ', immutable'
+        return response
+    return send_from_directory(folder, filename)
+
+# Поиск; /tag/<tag> - страница тега, тот же поиск с фильтром по тегу
+@main.route('/search', methods=['GET'])
+@main.route('/tag/<tag>')
+@read_only
+@cached_page('listings', 'users')
+def search(tag=None):
     query = request.args.get('q', '').strip()
     category = request.args.get('category', '')
-    sort_by = request.args.get('sort', 'newest')
-    if not query and not category:
+    tag = normalize_tag(tag or request.args.get('tag', ''))
+    sort_by = request.args.get('sort')
+    if not query and not category and not tag:
         flash('Введите поисковый запрос!')
-        return redirect(url_for('home_page_logged'))
-    search_query = ArticleModel.query.filter_by(status='published')
-    if query:
-        search_query = search_query.filter(
-            ArticleModel.title.contains(query) |
-            ArticleModel.content.contains(query) |
-            ArticleModel.tags.contains(query)
-        )
-    if category:
-        search_query = search_query.filter_by(category=category)
-    if sort_by == 'oldest':
-        search_query = search_query.order_by(ArticleModel.created_at.asc())
-    else: 
-        search_query = search_query.order_by(ArticleModel.created_at.desc())
-    
-
-    page = request.args.get('page', 1, type=int)
-    pagination = search_query.paginate(page=page, per_page=10, error_out=False)
+        return redirect(url_for('main.home_page_logged'))
+    cursor = request.args.get('cursor')
+    pagination = search_articles(query, category, sort_by, cursor=cursor, tag=tag)
     articles = pagination.items
     
     recent_activities = []  
@@ -195,12 +254,60 @@ def search():
                            articles=articles,
                            query=query,
                            category=category,
+                           tag=tag,
                            total_results=pagination.total,
                            pagination=pagination,
                            recent_activities=recent_activities)
 
+# В тренде: готовый снимок оценок из trending.py
+@main.route('/trending')
+@read_only
+@cached_page('trending', 'users')
+def trending_page():
+    pagination = trending_articles(request.args.get('cursor'))
+    return render_template('trending.html', articles=pagination.items, pagination=pagination)
+
+# Облако тегов
+@main.route('/tags')
+@read_only
+@cached_page('listings')
+def tags_page():
+    return render_template('tags.html', tags=popular_tags(limit=200))
+
+# Ленты RSS/Atom/JSON: публичные, одинаковые для всех, отдаются из кэша с 304
+FEED_FORMAT = '<any(rss, atom, json):fmt>'
+
+
+@main.route(f'/feed.{FEED_FORMAT}')
+@read_only
+@cached_page('listings', 'users', public=True)
+def feed(fmt):
+    return feed_response(fmt, 'NewsWrite Pro', feed_articles())
+
+
+@main.route(f'/feed/category/<category>.{FEED_FORMAT}')
+@read_only
+@cached_page('listings', 'users', public=True)
+def category_feed(category, fmt):
+    return feed_response(fmt, f'NewsWrite Pro: {category}', feed_articles(category=category))
+
+
+@main.route(f'/feed/author/<int:author_id>.{FEED_FORMAT}')
+@read_only
+@cached_page('listings', 'users', public=True)
+def author_feed(author_id, fmt):
+    author = db.get_or_404(UserModel, author_id)
+    return feed_response(fmt, f'NewsWrite Pro: {author.username}', feed_articles(author_id=author_id))
+
+
+@main.route(f'/feed/tag/<tag>.{FEED_FORMAT}')
+@read_only
+@cached_page('listings', 'users', public=True)
+def tag_feed(tag, fmt):
+    return feed_response(fmt, f'NewsWrite Pro: #{tag}', feed_articles(tag=tag))
+
 # Статьи ноты и все прочего из функционала
-@app.route('/create-article', methods=['GET', 'POST']) 
+@main.route('/create-article', methods=['GET', 'POST']) 
 @login_required
 def create_article():
     if request.method == 'POST':
@@ -221,10 +328,7 @@ def create_article():
             if allowed_file(articles_img.filename):
                 filename = secure_filename(articles_img.filename)
                 ext = filename.rsplit('.', 1)[1] if '.' in filename else ''
-                new_filename = f'article_{session["user_id"]}_{int(datetime.now().timestamp())}.{ext}'
-                file_path = os.path.join(app.config['ARTICLE_UPLOAD_FOLDER'], new_filename)
-                articles_img.save(file_path)
-                image_path = new_filename
+                image_path = save_upload(articles_img, current_app.config['ARTICLE_UPLOAD_FOLDER'], ext)
             else:
                 flash('Неправильное расширение изображения, допустимые расширения: PNG, JPG, JPEG, GIF')
                 return render_template('create_articles.html')
@@ -238,17 +342,24 @@ def create_article():
             author_id=session['user_id'],
             articles_img=image_path,
         )
+        render_article(new_article)
         
         try:
             db.session.add(new_article)
+            update_article_tags(new_article, tags)
             db.session.commit()
+            page_cache.invalidate('listings')
+            trending.touch(new_article.id)
+            if new_article.status == 'published':
+                timeline.article_published(current_app._get_current_object(), new_article.id)
+            schedule_variants(current_app._get_current_object(), 'article', new_article.id, image_path)
             
             if action == 'publish' or status == 'published':
                 flash('Статья успешно опубликована!')
             else:
                 flash('Статья сохранена как черновик!')
                 
-            return redirect(url_for('home_page_logged'))
+            return redirect(url_for('main.home_page_logged'))
             
         except Exception as e:
             db.session.rollback()
@@ -258,28 +369,52 @@ def create_article():
     
     return render_template('create_articles.html')
 
-@app.route('/my-articles')
+@main.route('/my-articles')
 @login_required
+@cached_page('listings', 'users')
 def my_articles():
-    articles = ArticleModel.query.filter_by(author_id=session['user_id']).order_by(ArticleModel.created_at.desc()).all()
-    return render_template('my_articles.html', articles=articles)
-
-@app.route('/view-article/<int:id>')
+    stmt = (db.select(ArticleModel)
+            .options(defer(ArticleModel.content), selectinload(ArticleModel.tag_list))
+            .filter_by(author_id=session['user_id']))
+    pagination = keyset_paginate(stmt, [ArticleModel.created_at, ArticleModel.id],
+                                 request.args.get('cursor'), per_page=20)
+    stats = get_author_stats(session['user_id'])
+    return render_template('my_articles.html', articles=pagination.items, pagination=pagination, stats=stats)
+
+@main.route('/view-article/<int:id>')
+@read_only
+@counts_view
+@cached_page(lambda id: f'article:{id}', 'users')
 def view_article(id):
-    article = ArticleModel.query.get_or_404(id)
-    return render_template('view_articles.html', article=article)
-
-@app.route('/edit-article/<int:id>', methods=['GET', 'POST'])
+    # content не нужен - отдаём готовый content_html (content подгрузится, только если его надо перерисовать)
+    article = db.get_or_404(ArticleModel, id, options=[joinedload(ArticleModel.author), defer(ArticleModel.content)])
+    user_liked = article.is_liked_by(session.get('user_id'))
+    comments = load_comments(article.id, request.args.get('comments'))
+    return render_template('view_articles.html', article=article, article_html=rendered_html(article),
+                           user_liked=user_liked, comments=comments)
+
+# Подгрузка следующей страницы комментариев ("Показать ещё")
+@main.route('/view-article/<int:id>/comments')
+@read_only
+@cached_page(lambda id: f'article:{id}', 'users')
+def article_comments(id):
+    comments = load_comments(id, request.args.get('cursor'))
+    return render_template('comments_list.html', article_id=id, comments=comments)
+
+@main.route('/edit-article/<int:id>', methods=['GET', 'POST'])
 @login_required
 def edit_article(id):
     article = ArticleModel.query.filter_by(id=id, author_id=session['user_id']).first_or_404()
     
     if request.method == 'POST':
+        was_published = article.status == 'published'
         title = request.form.get('title')
         content = request.form.get('content')
         category = request.form.get('category')
         tags = request.form.get('tags', '')
         action = request.form.get('action', 'save')
+        new_image = False
+        old_image = None
         articles_img = request.files.get('articles_img')
 
         if not title or not content or not category:
@@ -290,25 +425,19 @@ def edit_article(id):
             if allowed_file(articles_img.filename):
                 filename = secure_filename(articles_img.filename)
                 ext = filename.rsplit('.', 1)[1] if '.' in filename else ''
-                new_filename = f'article_{session["user_id"]}_{int(datetime.now().timestamp())}.{ext}'
-                file_path = os.path.join(app.config['ARTICLE_UPLOAD_FOLDER'], new_filename)
-                articles_img.save(file_path)
-                if article.articles_img and article.articles_img != 'default.png': 
-                    old_image_path = os.path.join(app.config['ARTICLE_UPLOAD_FOLDER'], article.articles_img)
-                    if os.path.exists(old_image_path):
-                        try:
-                            os.remove(old_image_path)
-                        except OSError:
-                            pass
+                new_filename = save_upload(articles_img, current_app.config['ARTICLE_UPLOAD_FOLDER'], ext)
+                old_image = article.articles_img
                 article.articles_img = new_filename  
+                article.img_variants = None
+                new_image = True
             else:
                 flash('Неправильное расширение изображения, допустимые расширения: PNG, JPG, JPEG, GIF')
                 return render_template('edit_articles.html', article=article)
 
         article.title = title
         article.content = content
+        render_article(article)
         article.category = category
-        article.tags = tags
         article.updated_at = datetime.utcnow()
         if action == 'publish':
             article.status = 'published'
@@ -316,14 +445,26 @@ def edit_article(id):
             article.status = 'draft'
 
         try:
+            update_article_tags(article, tags, was_published)
             db.session.commit()
+            page_cache.invalidate(f'article:{article.id}', 'listings')
+            trending.touch(article.id)
+            is_published = article.status == 'published'
+            if is_published and not was_published:
+                timeline.article_published(current_app._get_current_object(), article.id)
+            elif was_published and not is_published:
+                timeline.article_withdrawn(current_app._get_current_object(), article.id)
+            if new_image:
+                if old_image != article.articles_img:
+                    release_upload(current_app.config['ARTICLE_UPLOAD_FOLDER'], old_image, ArticleModel.articles_img)
+                schedule_variants(current_app._get_current_object(), 'article', article.id, article.articles_img)
             if action == 'publish':
                 flash('Статья успешно обновлена и опубликована!')
             elif action == 'draft':
                 flash('Статья сохранена как черновик!')
             else:
                 flash('Все изменения сохранены!')
-            return redirect(url_for('view_article', id=article.id))
+            return redirect(url_for('main.view_article', id=article.id))
         except Exception as e:
             db.session.rollback()
             flash(f'Ошибка при обновлении статьи: {str(e)}')
@@ -332,24 +473,30 @@ def edit_article(id):
 
     return render_template('edit_articles.html', article=article)
 
-@app.route('/delete-article/<int:id>', methods=['GET', 'POST'])
+@main.route('/delete-article/<int:id>', methods=['GET', 'POST'])
 @login_required
 def delete_article(id):
     article = ArticleModel.query.filter_by(id=id, author_id=session['user_id']).first_or_404()
     
+    image = article.articles_img
     try:
+        remove_article_tags(article)
         db.session.delete(article)
         db.session.commit()
+        page_cache.invalidate(f'article:{id}', 'listings')
+        trending.touch(id)
+        timeline.article_withdrawn(current_app._get_current_object(), id)
+        release_upload(current_app.config['ARTICLE_UPLOAD_FOLDER'], image, ArticleModel.articles_img)
         flash('Статья успешно удалена!')
     except Exception as e:
         db.session.rollback()
         flash(f'Ошибка при удалении статьи: {str(e)}')
     
-    return redirect(url_for('my_articles'))
+    return redirect(url_for('main.my_articles'))
 
 
 # Лайк
-@app.route('/like-article/<int:id>', methods=['POST'])
+@main.route('/like-article/<int:id>', methods=['POST'])
 @login_required
 def like_article(id):
     article = ArticleModel.query.get_or_404(id)
@@ -359,23 +506,28 @@ def like_article(id):
 
     if exsisting_like:
         db.session.delete(exsisting_like)
+        ArticleModel.adjust_counter(id, 'like_count', -1)
         db.session.commit()
         liked = False
     else:
         new_like = LikeModel(user_id=user_id, article_id=id)
         db.session.add(new_like)
+        ArticleModel.adjust_counter(id, 'like_count', 1)
         db.session.commit()
         liked = True
 
-    return redirect(url_for('view_article', id=article.id))
+    page_cache.invalidate(f'article:{id}')
+    # Снятый лайк из инкрементальной оценки не вычесть - пересчёт с нуля
+    trending.touch(id, rescan=not liked)
+    return redirect(url_for('main.view_article', id=article.id))
 
 
 # Коментарие
-@app.route('/add-comment/<int:id>', methods=['POST'])
+@main.route('/add-comment/<int:id>', methods=['POST'])
 def add_comment(id):
     if 'user_id' not in session:
         flash('Вы должны войти, чтобы оставить комментарий.')
-        return redirect(url_for('home_page_logged'))
+        return redirect(url_for('main.home_page_logged'))
 
     article = ArticleModel.query.get_or_404(id)
     content = request.form.get('content')
@@ -387,11 +539,14 @@ def add_comment(id):
             article_id=article.id
         )
         db.session.add(new_comment)
+        ArticleModel.adjust_counter(article.id, 'comment_count', 1)
         db.session.commit()
+        page_cache.invalidate(f'article:{article.id}')
+        trending.touch(article.id)
         flash('Комментарий добавлен!')
-    return redirect(url_for('view_article', id=article.id))
+    return redirect(url_for('main.view_article', id=article.id))
 
-@app.route('/delete-comment/<int:comment_id>', methods=['POST'])
+@main.route('/delete-comment/<int:comment_id>', methods=['POST'])
 @login_required
 def delete_comment(comment_id):
     comment = CommentModel.query.get_or_404(comment_id)
@@ -399,13 +554,16 @@ def delete_comment(comment_id):
         flash('Ты не можеш удалит чужой комент')
     else:
         db.session.delete(comment)
+        ArticleModel.adjust_counter(comment.article_id, 'comment_count', -1)
         db.session.commit()
+        page_cache.invalidate(f'article:{comment.article_id}')
+        trending.touch(comment.article_id, rescan=True)
         flash('Комент удалён')
-    return redirect(url_for('view_article', id=comment.article_id))
+    return redirect(url_for('main.view_article', id=comment.article_id))
 
 
 # Вес система входа и выхода из аккаунта 
-@app.route('/sign-up', methods=['GET', 'POST'])
+@main.route('/sign-up', methods=['GET', 'POST'])
 def sign_up_page():
     if request.method == 'POST':
         username = request.form.get('user_name')
@@ -415,7 +573,7 @@ def sign_up_page():
         
         if not username or not email or not age or not password:
             flash('Пожалуйста, заполните все поля.')
-            return redirect(url_for('sign_up_page'))
+            return redirect(url_for('main.sign_up_page'))
         
         new_user = UserModel(username=username, email=email, age=age)
         new_user.set_password(password)
@@ -424,7 +582,7 @@ def sign_up_page():
             db.session.add(new_user)
             db.session.commit()
             flash('Пользователь успешно зарегистрирован!')
-            return redirect(url_for('home_page'))
+            return redirect(url_for('main.home_page'))
         except Exception as e:
             db.session.rollback()
             flash(f'Произошла ошибка при регистрации пользователя: {str(e)}')
@@ -432,7 +590,7 @@ def sign_up_page():
     
     return render_template('sign_up.html')
 
-@app.route('/sign-in', methods=['GET', 'POST'])
+@main.route('/sign-in', methods=['GET', 'POST'])
 def sign_in_page():
     if request.method == 'POST':
         email = request.form.get('user_email')
@@ -440,31 +598,164 @@ def sign_in_page():
         
         if not email or not password:
             flash('Пожалуйста, заполните все поля.')
-            return redirect(url_for('sign_in_page'))
+            return redirect(url_for('main.sign_in_page'))
         
         user = UserModel.query.filter_by(email=email).first()
         
         if user and user.check_password(password):
+            # Поменялась стоимость bcrypt - перехэшируем, пока знаем пароль
+            if user.password_needs_rehash():
+                user.set_password(password)
+                db.session.commit()
             session['user_id'] = user.id
-            session['username'] = user.username 
             flash('Вы успешно вошли в систему!')
-            return redirect(url_for('home_page'))
+            return redirect(url_for('main.home_page'))
         else:
             flash('Неверный email или пароль.')
-            return redirect(url_for('sign_in_page'))
+            return redirect(url_for('main.sign_in_page'))
     
     return render_template('sign_in.html')
 
-@app.route('/logout')
+@main.route('/logout')
 def logout():
     session.pop('user_id', None)
     session.pop('username', None) 
     flash('Вы успешно вышли из системы.')
-    return redirect(url_for('home_page'))
+    return redirect(url_for('main.home_page'))
+
+
+# CLI команды
+@main.cli.command('search-reindex')
+def search_reindex_command():
+    """Пересобрать полнотекстовый индекс статей (FTS5)."""
+    if ensure_search_index(rebuild=True):
+        print('Поисковый индекс пересобран.')
+    else:
+        print('FTS5 доступен только для SQLite, используется поиск через LIKE.')
+
+
+@main.cli.command('images-rebuild')
+def images_rebuild_command():
+    """Сгенерировать WebP копии для всех уже загруженных картинок."""
+    for article in ArticleModel.query.filter(ArticleModel.articles_img.isnot(None)):
+        schedule_variants(current_app._get_current_object(), 'article', article.id, article.articles_img)
+    for user in UserModel.query.filter(UserModel.avatar.isnot(None), UserModel.avatar != 'default.png'):
+        schedule_variants(current_app._get_current_object(), 'avatar', user.id, user.avatar)
+    print('Обработка картинок запущена.')
+
+
+@main.cli.command('build-assets')
+def build_assets_command():
+    """Собрать статику с хэшем в имени и сжатые копии (static/dist)."""
+    files = assets.build()
+    print(f'Файлов статики: {len(files)}.')
+
+
+@main.cli.command('check-query-plans')
+@click.option('--seed', is_flag=True, help='Заполнить пустую базу тестовыми данными.')
+def check_query_plans_command(seed):
+    """Проверить, что запросы всех маршрутов идут по индексам (EXPLAIN QUERY PLAN)."""
+    problems = check_query_plans(current_app._get_current_object(), seed=seed)
+    for method, url, statement, scans in problems:
+        print(f'{method} {url}: {"; ".join(scans)}')
+        print(f'    {" ".join(statement.split())}')
+    if problems:
+        raise SystemExit(1)
+    print('Все запросы используют индексы.')
+
+
+@main.cli.command('articles-rerender')
+def articles_rerender_command():
+    """Перерисовать content_html статей, сохранённых старой версией рендерера."""
+    print(f'Перерисовано статей: {rerender_stale()}')
+
+
+@main.cli.command('tags-rebuild')
+def tags_rebuild_command():
+    """Заново разобрать строки тегов всех статей и пересчитать счётчики тегов."""
+    print(f'Тегов: {rebuild_tags()}')
+
+
+@main.cli.command('trending-refresh')
+@click.option('--full', is_flag=True, help='Пересчитать все опубликованные статьи, а не только изменённые.')
+def trending_refresh_command(full):
+    """Пересчитать оценки ленты "В тренде"."""
+    view_counter.flush()
+    print(f'Пересчитано статей: {trending.refresh(full=full)}')
+
+
+@main.cli.command('flush-views')
+def flush_views_command():
+    """Записать накопленные в памяти просмотры в базу."""
+    print(f'Обновлено статей: {view_counter.flush()}')
+
+
+@main.cli.command('repair-counters')
+def repair_counters_command():
+    """Пересчитать like_count и comment_count всех статей."""
+    updated = ArticleModel.recount_counters()
+    db.session.commit()
+    print(f'Счётчики пересчитаны для {updated} статей.')
+
+
+@main.cli.command('bench')
+@click.option('--seed', is_flag=True, help='Создать таблицы и заполнить пустую базу сгенерированными данными.')
+@click.option('--users', default=50, show_default=True)
+@click.option('--articles', default=500, show_default=True)
+@click.option('--likes', default=5000, show_default=True)
+@click.option('--comments', default=5000, show_default=True)
+@click.option('--requests', 'n_requests', default=200, show_default=True, help='Запросов на маршрут.')
+@click.option('--concurrency', default=1, show_default=True)
+@click.option('--route', 'routes', multiple=True, help='Только указанные сценарии (home, search, view_article, ...).')
+@click.option('--url', default=None, help='Мерить живой сервер по HTTP вместо test client.')
+@click.option('--no-cache', is_flag=True, help='Отключить кэш страниц на время замера.')
+@click.option('--save', 'save_path', default=None, help='Сохранить результат в JSON.')
+@click.option('--compare', 'compare_path', default=None, help='Сравнить с сохранённым JSON.')
+def bench_command(seed, users, articles, likes, comments, n_requests, concurrency, routes, url, no_cache,
+                  save_path, compare_path):
+    """Нагрузочный замер всех маршрутов: RPS и p50/p95/p99."""
+    if seed:
+        db.create_all()
+        if not ArticleModel.query.first():
+            print(f'Сгенерировано: {generate_dataset(users, articles, likes, comments)}')
+    report = run_benchmark(current_app._get_current_object(), requests=n_requests, concurrency=concurrency, scenarios=list(routes) or None,
+                           base_url=url, use_cache=not no_cache)
+    view_counter.flush()
+    baseline = load_report(compare_path) if compare_path else None
+    print(format_report(report, baseline))
+    if save_path:
+        save_report(report, save_path)
+        print(f'Результат сохранён в {save_path}')
+
+
+@main.cli.command('import-data')
+@click.argument('kind', type=click.Choice(list(BULK_MODELS)))
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--batch-size', default=1000, show_default=True, help='Строк на один INSERT и коммит.')
+def import_data_command(kind, source, batch_size):
+    """Импортировать users/articles/likes/comments из JSONL (- для stdin)."""
+    try:
+        total = import_jsonl(kind, source, batch_size=batch_size)
+    except BulkImportError as e:
+        raise click.ClickException(str(e))
+    page_cache.invalidate('listings', 'users')
+    print(f'Импортировано записей: {total}')
+
+
+@main.cli.command('export-data')
+@click.argument('kind', type=click.Choice(list(BULK_MODELS)))
+@click.argument('target', type=click.File('w', encoding='utf-8'), default='-')
+@click.option('--batch-size', default=1000, show_default=True, help='Строк на одно чтение из базы.')
+def export_data_command(kind, target, batch_size):
+    """Выгрузить таблицу в JSONL (по умолчанию в stdout)."""
+    total = export_jsonl(kind, target, batch_size=batch_size)
+    click.echo(f'Выгружено записей: {total}', err=True)
 
 
 # Сохраняем db и запускаем сервак
 if __name__ == '__main__':
+    app = create_app()
     with app.app_context():
         db.create_all()
+        ensure_search_index()
     app.run(debug=True)
\ No newline at end of file
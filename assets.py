@@ -0,0 +1,147 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+
+from flask import current_app, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # без brotli - только gzip
+    brotli = None
+
+# Статика с хэшем в имени: flask build-assets (и serve.py при старте) копирует
+# файлы из static/ в static/dist/ как css/styles.<хэш>.css, рядом кладёт сжатые
+# .br/.gz и пишет manifest.json. url_for('static', filename='css/styles.css')
+# через манифест отдаёт имя с хэшем, такие файлы кэшируются браузером навсегда
+# (immutable) - повторный визит не скачивает статику вообще. Сжатый вариант
+# выбирается по Accept-Encoding. Без манифеста всё работает по старым именам.
+
+ASSETS_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+ONE_YEAR = 365 * 24 * 3600
+# Картинки уже сжаты - для них .gz/.br не делаем
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.ico', '.map'}
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+SUFFIXES = dict(ENCODINGS)
+
+
+def _write(path, data):
+    # Имя по содержимому: файл уже есть - значит он такой же
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.asset-')
+    with os.fdopen(fd, 'wb') as out:
+        out.write(data)
+    os.replace(tmp, path)
+
+
+def _compress(data):
+    yield 'gzip', gzip.compress(data, 9, mtime=0)
+    if brotli is not None:
+        yield 'br', brotli.compress(data, quality=11)
+
+
+class Assets:
+    def __init__(self):
+        self.app = None
+        self.files = {}
+        self.hashed = set()
+        self.encodings = {}
+
+    def init_app(self, app):
+        self.app = app
+        # Загрузки отдаёт uploaded_file, их не трогаем
+        app.config.setdefault('ASSETS_EXCLUDE', ['uploads'])
+        app.config.setdefault('ASSETS_FINGERPRINT', True)
+        if app.config['ASSETS_FINGERPRINT']:
+            self.load()
+        app.url_defaults(self._url_defaults)
+        app.view_functions['static'] = self.send_static
+
+    @property
+    def folder(self):
+        return os.path.join(self.app.static_folder, ASSETS_DIR)
+
+    def load(self):
+        try:
+            with open(os.path.join(self.folder, MANIFEST_NAME), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {}
+        self.files = manifest.get('files', {})
+        self.hashed = set(self.files.values())
+        self.encodings = manifest.get('encodings', {})
+
+    def build(self):
+        """Собрать static/dist и манифест; возвращает {исходное имя: имя с хэшем}."""
+        static = self.app.static_folder
+        skip = {ASSETS_DIR, *self.app.config['ASSETS_EXCLUDE']}
+        files, encodings = {}, {}
+        os.makedirs(self.folder, exist_ok=True)
+        for root, dirs, names in os.walk(static):
+            if root == static:
+                dirs[:] = [d for d in dirs if d not in skip]
+            for name in names:
+                if name.startswith('.'):
+                    continue
+                path = os.path.join(root, name)
+                source = os.path.relpath(path, static).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    data = f.read()
+                base, ext = os.path.splitext(source)
+                hashed = f'{base}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+                _write(os.path.join(self.folder, hashed), data)
+                files[source] = hashed
+                if ext.lower() not in COMPRESSIBLE:
+                    continue
+                for encoding, packed in _compress(data):
+                    # Выигрыш меньше 10% - не стоит отдельного файла
+                    if len(packed) < len(data) * 0.9:
+                        _write(os.path.join(self.folder, hashed + SUFFIXES[encoding]), packed)
+                        encodings.setdefault(hashed, []).append(encoding)
+        # Старые файлы с хэшем не удаляем: на них могут ссылаться закэшированные страницы
+        fd, tmp = tempfile.mkstemp(dir=self.folder, prefix='.manifest-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as out:
+            json.dump({'files': files, 'encodings': encodings}, out, indent=2, sort_keys=True)
+        os.replace(tmp, os.path.join(self.folder, MANIFEST_NAME))
+        if self.app.config['ASSETS_FINGERPRINT']:
+            self.load()
+        return files
+
+    def _url_defaults(self, endpoint, values):
+        if endpoint == 'static':
+            hashed = self.files.get(values.get('filename'))
+            if hashed:
+                values['filename'] = f'{ASSETS_DIR}/{hashed}'
+
+    def send_static(self, filename):
+        """Замена стандартного обработчика /static/: файлы с хэшем - сжатые и навсегда."""
+        prefix = ASSETS_DIR + '/'
+        hashed = filename[len(prefix):] if filename.startswith(prefix) else None
+        if hashed is None or hashed not in self.hashed:
+            return current_app.send_static_file(filename)
+
+        available = self.encodings.get(hashed, [])
+        name, encoding = hashed, None
+        for candidate, suffix in ENCODINGS:
+            if candidate in available and request.accept_encodings[candidate]:
+                name, encoding = hashed + suffix, candidate
+                break
+        mimetype = None
+        if encoding:
+            mimetype = mimetypes.guess_type(hashed)[0] or 'application/octet-stream'
+        response = send_from_directory(self.folder, name, max_age=ONE_YEAR,
+                                       mimetype=mimetype, download_name=os.path.basename(hashed))
+        response.headers['Cache-Control'] += ', immutable'
+        if available:
+            response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+
+assets = Assets()
@@ -0,0 +1,264 @@
+import json
+import random
+import queue
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.cookiejar import CookieJar
+
+from models import db, UserModel, ArticleModel, CommentModel, LikeModel
+from pagecache import page_cache, NullCache
+from passwords import hasher
+from search import ensure_search_index
+from tags import rebuild_tags
+from trending import trending
+
+# Нагрузочные замеры: детерминированный генератор данных и прогон всех
+# маршрутов с подсчётом RPS и p50/p95/p99. Результат сохраняется в JSON,
+# чтобы сравнивать оптимизации с базовой линией.
+
+BENCH_PASSWORD = 'password'
+BASE_DATE = datetime(2025, 1, 1)
+CATEGORIES = ['Технологии', 'Наука', 'Спорт', 'Культура', 'Политика']
+WORDS = (
+    'python flask база данных запрос индекс кэш статья автор новости сервер '
+    'страница пользователь комментарий лайк поиск производительность память '
+    'данные модель шаблон маршрут миграция sqlite postgres worker процесс поток '
+    'очередь задача время ответ нагрузка система проект команда релиз версия'
+).split()
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _content(rng):
+    # Размер статьи ~ логнормальный: в основном 1-5 КБ, изредка 20+ КБ
+    paragraphs = max(1, int(rng.lognormvariate(1.5, 0.6)))
+    return '\n\n'.join(
+        '<p>' + _text(rng, rng.randint(40, 120)).capitalize() + '.</p>' for _ in range(paragraphs)
+    )
+
+
+def _insert(model, rows, batch_size=1000):
+    for i in range(0, len(rows), batch_size):
+        db.session.execute(db.insert(model), rows[i:i + batch_size])
+
+
+def generate_dataset(users=50, articles=500, likes=5000, comments=5000, seed=42):
+    """Заполняет пустую базу; одинаковый seed - одинаковые данные."""
+    if db.session.execute(db.select(ArticleModel.id).limit(1)).first():
+        raise RuntimeError('База не пустая, генератор работает только с чистой базой')
+    rng = random.Random(seed)
+    password_hash = hasher.hash(BENCH_PASSWORD)
+
+    _insert(UserModel, [
+        {'id': i, 'username': f'bench_user_{i}', 'email': f'bench{i}@example.com',
+         'age': rng.randint(16, 70), 'password_hash': password_hash, 'avatar': 'default.png'}
+        for i in range(1, users + 1)
+    ])
+
+    article_rows = []
+    for i in range(1, articles + 1):
+        created = BASE_DATE + timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+        article_rows.append({
+            'id': i, 'title': _text(rng, rng.randint(3, 9)).capitalize(),
+            'content': _content(rng), 'category': rng.choice(CATEGORIES),
+            'status': 'published' if rng.random() < 0.85 else 'draft',
+            'tags': ', '.join(rng.sample(WORDS, rng.randint(1, 4))),
+            # Авторы неравномерны: часть пишет много
+            'author_id': min(users, int(rng.paretovariate(1.2))),
+            'created_at': created, 'updated_at': created,
+        })
+    _insert(ArticleModel, article_rows)
+
+    # Популярность статей тоже неравномерна - лайки и комментарии скапливаются на "хитах"
+    weights = [rng.paretovariate(1.0) for _ in range(articles)]
+    pairs = set()
+    for article_id in rng.choices(range(1, articles + 1), weights, k=likes):
+        pairs.add((rng.randint(1, users), article_id))
+    _insert(LikeModel, [
+        {'user_id': u, 'article_id': a, 'created_at': BASE_DATE + timedelta(minutes=rng.randint(0, 525600))}
+        for u, a in sorted(pairs)
+    ])
+    _insert(CommentModel, [
+        {'content': _text(rng, rng.randint(5, 60)), 'user_id': rng.randint(1, users), 'article_id': a,
+         'created_at': BASE_DATE + timedelta(minutes=rng.randint(0, 525600))}
+        for a in rng.choices(range(1, articles + 1), weights, k=comments)
+    ])
+    db.session.commit()
+    ArticleModel.recount_counters()
+    db.session.commit()
+    rebuild_tags()
+    trending.refresh(full=True)
+    ensure_search_index(rebuild=True)
+    return {'users': users, 'articles': articles, 'likes': len(pairs), 'comments': comments}
+
+
+def _scenarios(rng, article_ids):
+    def pick():
+        return rng.choice(article_ids)
+    query = lambda: rng.choice(WORDS)
+    return {
+        'home': lambda: ('GET', '/home', None),
+        'home_search': lambda: ('GET', f'/home?q={urllib.parse.quote(query())}', None),
+        'search': lambda: ('GET', f'/search?q={urllib.parse.quote(query())}', None),
+        'search_tag': lambda: ('GET', f'/tag/{urllib.parse.quote(query())}', None),
+        'tags': lambda: ('GET', '/tags', None),
+        'trending': lambda: ('GET', '/trending', None),
+        'search_category': lambda: ('GET', f'/search?category={urllib.parse.quote(rng.choice(CATEGORIES))}', None),
+        'view_article': lambda: ('GET', f'/view-article/{pick()}', None),
+        'my_articles': lambda: ('GET', '/my-articles', None),
+        'profile': lambda: ('GET', '/profile', None),
+        'api_articles': lambda: ('GET', '/api/v1/articles?fields=title,excerpt,author_id', None),
+        'api_batch': lambda: ('GET', f'/api/v1/articles?ids={",".join(str(pick()) for _ in range(20))}', None),
+        'like': lambda: ('POST', f'/like-article/{pick()}', {}),
+        'comment': lambda: ('POST', f'/add-comment/{pick()}', {'content': _text(rng, 12)}),
+    }
+
+
+class _Driver:
+    """Пул залогиненных клиентов - по одному на поток, логин вне замера."""
+
+    def __init__(self, size):
+        self._clients = queue.Queue()
+        for _ in range(size):
+            self._clients.put(self.connect())
+
+    def request(self, method, url, data):
+        client = self._clients.get()
+        try:
+            return self.send(client, method, url, data)
+        finally:
+            self._clients.put(client)
+
+
+class _TestClientDriver(_Driver):
+    def __init__(self, app, user_id, size):
+        self.app = app
+        self.user_id = user_id
+        super().__init__(size)
+
+    def connect(self):
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = self.user_id
+        return client
+
+    def send(self, client, method, url, data):
+        response = client.open(url, method=method, data=data)
+        response.close()
+        return response.status_code
+
+
+class _WSGIDriver(_Driver):
+    def __init__(self, base_url, email, size):
+        self.base_url = base_url.rstrip('/')
+        self.email = email
+        super().__init__(size)
+
+    def connect(self):
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+        form = urllib.parse.urlencode({'user_email': self.email, 'user_password': BENCH_PASSWORD})
+        opener.open(self.base_url + '/sign-in', form.encode()).read()
+        return opener
+
+    def send(self, opener, method, url, data):
+        body = urllib.parse.urlencode(data).encode() if method == 'POST' else None
+        try:
+            with opener.open(self.base_url + url, body) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def run_benchmark(app, requests=200, concurrency=1, warmup=20, scenarios=None,
+                  base_url=None, seed=42, use_cache=True):
+    """Прогоняет сценарии; base_url - мерить через HTTP сервер, иначе через test client."""
+    rng = random.Random(seed)
+    article_ids = list(db.session.execute(
+        db.select(ArticleModel.id).filter_by(status='published').order_by(ArticleModel.id)
+    ).scalars())
+    if not article_ids:
+        raise RuntimeError('Нет опубликованных статей, запустите с --seed')
+    user_id, email = db.session.execute(
+        db.select(UserModel.id, UserModel.email).order_by(UserModel.id).limit(1)
+    ).one()
+    db.session.remove()
+
+    driver = _WSGIDriver(base_url, email, concurrency) if base_url else _TestClientDriver(app, user_id, concurrency)
+    available = _scenarios(rng, article_ids)
+    names = scenarios or list(available)
+    backend = page_cache.backend
+    if not use_cache:
+        page_cache.backend = NullCache()
+
+    results = {}
+    try:
+        for name in names:
+            make = available[name]
+            jobs = [make() for _ in range(warmup + requests)]
+            for job in jobs[:warmup]:
+                driver.request(*job)
+
+            def timed(job):
+                start = time.perf_counter()
+                status = driver.request(*job)
+                return time.perf_counter() - start, status
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as pool:
+                samples = list(pool.map(timed, jobs[warmup:]))
+            elapsed = time.perf_counter() - started
+
+            latencies = sorted(s[0] * 1000 for s in samples)
+            errors = sum(1 for s in samples if s[1] >= 400)
+            results[name] = {
+                'requests': requests,
+                'errors': errors,
+                'rps': round(requests / elapsed, 1),
+                'p50_ms': round(_percentile(latencies, 50), 2),
+                'p95_ms': round(_percentile(latencies, 95), 2),
+                'p99_ms': round(_percentile(latencies, 99), 2),
+            }
+    finally:
+        page_cache.backend = backend
+    return {
+        'meta': {'requests': requests, 'concurrency': concurrency, 'driver': 'wsgi' if base_url else 'test_client',
+                 'cache': use_cache, 'date': datetime.now().isoformat(timespec='seconds')},
+        'results': results,
+    }
+
+
+def format_report(report, baseline=None):
+    lines = [f"{'route':<16}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'err':>6}"]
+    for name, r in report['results'].items():
+        line = f"{name:<16}{r['rps']:>9}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['errors']:>6}"
+        old = (baseline or {}).get('results', {}).get(name)
+        if old and old['p50_ms']:
+            change = (r['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100
+            line += f'   p50 {change:+.0f}% vs baseline'
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def save_report(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
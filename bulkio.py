@@ -0,0 +1,130 @@
+import json
+from datetime import date, datetime
+from itertools import islice
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, UserModel, ArticleModel, CommentModel, LikeModel
+from passwords import hasher
+from tags import rebuild_tags
+from trending import trending
+
+# Массовый импорт/экспорт в JSONL (одна запись на строку). Импорт идёт
+# пачками: один executemany INSERT и один коммит на пачку. Экспорт читает
+# курсором по yield_per строк, весь набор в память не грузится.
+
+MODELS = {
+    'users': UserModel,
+    'articles': ArticleModel,
+    'likes': LikeModel,
+    'comments': CommentModel,
+}
+
+
+class BulkImportError(ValueError):
+    pass
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется в JSON')
+
+
+def _row_converter(table):
+    columns = {c.name: c for c in table.columns}
+    datetimes = {name for name, c in columns.items() if isinstance(c.type, db.DateTime)}
+
+    def convert(record, line_no):
+        if not isinstance(record, dict):
+            raise BulkImportError(f'строка {line_no}: ожидается JSON объект')
+        if table.name == 'users' and 'password' in record:
+            # Открытый пароль хэшируем здесь; для больших выгрузок лучше передавать password_hash
+            record = dict(record, password_hash=hasher.hash(record.pop('password')))
+        row = {}
+        for key, value in record.items():
+            if key not in columns:
+                continue
+            if key in datetimes and isinstance(value, str):
+                try:
+                    value = datetime.fromisoformat(value)
+                except ValueError:
+                    raise BulkImportError(f'строка {line_no}: неверная дата в поле {key}: {value!r}')
+            row[key] = value
+        missing = [name for name, c in columns.items()
+                   if not c.nullable and not c.primary_key and c.default is None
+                   and c.server_default is None and name not in row]
+        if missing:
+            raise BulkImportError(f'строка {line_no}: нет обязательных полей {", ".join(missing)}')
+        return row
+    return convert
+
+
+def _records(lines):
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as e:
+            raise BulkImportError(f'строка {line_no}: {e}')
+
+
+def import_jsonl(kind, lines, batch_size=1000):
+    """Импортирует записи пачками; возвращает число вставленных строк.
+
+    Уже закоммиченные пачки при ошибке остаются в базе.
+    """
+    model = MODELS[kind]
+    table = model.__table__
+    convert = _row_converter(table)
+    # Python-side default'ы (created_at и т.п.) Core insert проставит сам
+    stmt = db.insert(table)
+    records = _records(lines)
+    total = 0
+    while True:
+        numbered = list(islice(records, batch_size))
+        if not numbered:
+            break
+        batch = [convert(record, line_no) for line_no, record in numbered]
+        # executemany требует одинаковый набор ключей - группируем строки пачки
+        groups = {}
+        for row in batch:
+            groups.setdefault(frozenset(row), []).append(row)
+        try:
+            for rows in groups.values():
+                db.session.execute(stmt, rows)
+            db.session.commit()
+        except IntegrityError as e:
+            # Дубликат username/email, несуществующий author_id и т.п. - пачка целиком откатывается
+            db.session.rollback()
+            raise BulkImportError(f'строки {numbered[0][0]}-{numbered[-1][0]}: '
+                                  f'нарушено ограничение базы ({e.orig}), импортировано до них: {total}')
+        except Exception:
+            db.session.rollback()
+            raise
+        total += len(batch)
+    if kind in ('articles', 'likes', 'comments') and total:
+        ArticleModel.recount_counters()
+        db.session.commit()
+    if kind == 'articles' and total:
+        rebuild_tags()
+    if kind in ('articles', 'likes', 'comments') and total:
+        trending.refresh(full=True)
+    return total
+
+
+def export_jsonl(kind, out, batch_size=1000):
+    """Пишет таблицу в out построчно, возвращает число записей."""
+    table = MODELS[kind].__table__
+    total = 0
+    with db.engine.connect() as conn:
+        result = conn.execution_options(yield_per=batch_size).execute(
+            db.select(table).order_by(table.c.id)
+        )
+        for row in result.mappings():
+            out.write(json.dumps(dict(row), ensure_ascii=False, default=_json_default))
+            out.write('\n')
+            total += 1
+    return total
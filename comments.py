@@ -0,0 +1,18 @@
+from sqlalchemy.orm import joinedload
+
+from cursors import keyset_paginate
+from models import db, CommentModel
+
+COMMENTS_PER_PAGE = 20
+
+# Комментарии статьи страницами, новые сверху; автор подгружается тем же
+# запросом (JOIN), чтобы шаблон не делал по запросу на каждый комментарий.
+
+
+def load_comments(article_id, cursor=None, per_page=COMMENTS_PER_PAGE):
+    stmt = (
+        db.select(CommentModel)
+        .options(joinedload(CommentModel.user))
+        .where(CommentModel.article_id == article_id)
+    )
+    return keyset_paginate(stmt, [CommentModel.created_at, CommentModel.id], cursor, per_page)
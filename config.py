@@ -2,21 +2,91 @@ import os
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'my-super-secret-key'
-    
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///dev_database.db'
+
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///site.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Реплика только для чтения (view_article, поиск); пусто - всё идёт в основную базу
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+
+    # Пул соединений для серверных баз (PostgreSQL и т.п.), для SQLite не используется
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_RECYCLE = 1800
+    DB_POOL_TIMEOUT = 30
+    # PRAGMA для каждого нового соединения SQLite
+    SQLITE_PRAGMAS = {'busy_timeout': 5000}
+
+    UPLOAD_FOLDER = 'static/uploads/avatars'
+    ARTICLE_UPLOAD_FOLDER = 'static/uploads/articles'
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+    # Потоки для нарезки картинок в WebP (0 - обрабатывать прямо в запросе)
+    IMAGE_WORKERS = 2
+
+    # Профилирование SQL по запросам (SQL_PROFILE=1), панель внизу страницы - SQL_PROFILE_PANEL=1
+    SQL_PROFILE = os.environ.get('SQL_PROFILE') == '1'
+    SQL_PROFILE_PANEL = os.environ.get('SQL_PROFILE_PANEL') == '1'
+
+    # Кэш страниц: lru (в памяти процесса), filesystem (общий для процессов) или null
+    PAGE_CACHE_TYPE = os.environ.get('PAGE_CACHE_TYPE', 'lru')
+    PAGE_CACHE_MAX_ENTRIES = 1024
+    PAGE_CACHE_TTL = 300
+    # Статей в RSS/Atom/JSON ленте
+    FEED_SIZE = 50
+
+    # Домашняя лента: потоки для fan-out (0 - прямо в запросе), размер пачки вставок и
+    # порог подписчиков, выше которого статьи автора не раскладываются, а подмешиваются при чтении
+    TIMELINE_WORKERS = 1
+    TIMELINE_BATCH = 1000
+    TIMELINE_FANOUT_LIMIT = 10000
+
+    # bcrypt: стоимость и пул процессов (PASSWORD_HASH_WORKERS=0 - считать прямо в запросе)
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = 16
+
+    # python serve.py: адрес, процессы, потоки в процессе и сколько ждать
+    # завершения запросов при остановке (SIGTERM), прежде чем убить воркер
+    SERVER_BIND = os.environ.get('SERVER_BIND', '127.0.0.1:8000')
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', os.cpu_count() or 1))
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 8))
+    SERVER_GRACEFUL_TIMEOUT = 30
+
+    # url_for('static') отдаёт имена с хэшем из static/dist/manifest.json (flask build-assets)
+    ASSETS_FINGERPRINT = True
 
     DEBUG = False
     TESTING = False
 
 class DevelopmentConfig(Config):
     DEBUG = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///dev_database.db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///dev_database.db'
+    # Правки в static/ видны сразу, без пересборки
+    ASSETS_FINGERPRINT = False
 
 class ProductionConfig(Config):
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
+    # WAL: читатели не ждут писателя; NORMAL в WAL режиме безопасен и быстрее FULL
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'busy_timeout': 5000,
+        'synchronous': 'NORMAL',
+    }
+    PAGE_CACHE_TYPE = os.environ.get('PAGE_CACHE_TYPE', 'filesystem')
 
 class TestingConfig(Config):
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    PAGE_CACHE_TYPE = 'null'
+    IMAGE_WORKERS = 0
+    PASSWORD_HASH_WORKERS = 0
+    BCRYPT_LOG_ROUNDS = 4
+    TRENDING_REFRESH_INTERVAL = 0
+    TIMELINE_WORKERS = 0
+
+config = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+    'default': Config,
+}
@@ -0,0 +1,62 @@
+from flask import g, session
+
+from models import db, UserModel
+from pagecache import LRUCache
+
+# Текущий пользователь: читается из базы не больше раза за запрос (g.current_user),
+# а между запросами берётся из небольшого LRU кэша с TTL. В кэше только то,
+# что нужно шапке страниц и проверкам доступа, - без email и пароля.
+# profile_page и нарезка аватаров сбрасывают запись; кэш свой в каждом процессе,
+# другие воркеры увидят новое имя не позже чем через USER_CACHE_TTL секунд.
+
+
+class CurrentUser:
+    __slots__ = ('id', 'username', 'avatar', 'avatar_variants')
+
+    def __init__(self, id, username, avatar, avatar_variants):
+        self.id = id
+        self.username = username
+        self.avatar = avatar
+        self.avatar_variants = avatar_variants
+
+    get_avatar_url = UserModel.get_avatar_url
+
+
+class UserCache:
+    def __init__(self):
+        self._cache = LRUCache(max_entries=0)
+
+    def init_app(self, app):
+        app.config.setdefault('USER_CACHE_TTL', 60)
+        # 0 - не кэшировать между запросами
+        app.config.setdefault('USER_CACHE_MAX_ENTRIES', 1024)
+        self._cache = LRUCache(app.config['USER_CACHE_MAX_ENTRIES'], app.config['USER_CACHE_TTL'])
+        app.context_processor(lambda: {'current_user': current_user()})
+
+    def get(self, user_id):
+        user = self._cache.get(user_id)
+        if user is None:
+            row = db.session.execute(
+                db.select(UserModel.id, UserModel.username, UserModel.avatar, UserModel.avatar_variants)
+                .where(UserModel.id == user_id)
+            ).first()
+            if row is None:
+                return None
+            user = CurrentUser(*row)
+            self._cache.set(user_id, user)
+        return user
+
+    def invalidate(self, user_id):
+        self._cache.delete(user_id)
+        g.pop('current_user', None)
+
+
+user_cache = UserCache()
+
+
+def current_user():
+    """Пользователь из сессии (CurrentUser) или None."""
+    if 'current_user' not in g:
+        user_id = session.get('user_id')
+        g.current_user = user_cache.get(user_id) if user_id else None
+    return g.current_user
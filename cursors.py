@@ -0,0 +1,129 @@
+import base64
+import json
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from models import db
+
+# Keyset (cursor) пагинация: вместо OFFSET + COUNT(*) следующая страница
+# берётся по условию (created_at, id) < (последний created_at, последний id).
+# Курсор - непрозрачная base64 строка с ключом строки и направлением.
+
+
+def _dump(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _load(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(key, direction='next', total=None):
+    payload = {'k': [_dump(v) for v in key], 'd': direction}
+    if total is not None:
+        payload['t'] = total
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _matches(value, column):
+    """Подходит ли значение из курсора к типу колонки ключа (курсор приходит от клиента)."""
+    if isinstance(value, bool):
+        return False
+    try:
+        expected = column.type.python_type
+    except NotImplementedError:
+        # Выражение без python типа (например, ранг поиска) - принимаем только скаляры
+        return isinstance(value, (str, int, float))
+    if expected is float:
+        expected = (int, float)
+    return isinstance(value, expected)
+
+
+def decode_cursor(token, keys=None):
+    """Возвращает (key, direction, total) или None для битого курсора.
+    keys - колонки ключа: число и типы значений курсора должны им соответствовать."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        key = [_load(v) for v in payload['k']]
+        direction = payload.get('d', 'next')
+        total = payload.get('t')
+    except (ValueError, KeyError, TypeError):
+        return None
+    if direction not in ('next', 'prev') or not (total is None or type(total) is int):
+        return None
+    if keys is not None and (len(key) != len(keys) or not all(map(_matches, key, keys))):
+        return None
+    return key, direction, total
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, prev_cursor=None, total=None, per_page=10):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.per_page = per_page
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+def keyset_paginate(stmt, keys, cursor=None, per_page=10, descending=True,
+                    count_stmt=None, scalars=True):
+    """Одна страница stmt, упорядоченного по keys (последний ключ должен быть уникальным, обычно id).
+
+    count_stmt считается только на первой странице, дальше приблизительный total
+    переносится в курсоре. scalars=False - элементы страницы - строки целиком.
+    """
+    decoded = decode_cursor(cursor, keys)
+    key, direction, total = decoded if decoded else (None, 'next', None)
+
+    # Для "назад" идём в обратном порядке и потом разворачиваем страницу
+    reverse = direction == 'prev'
+    desc = descending != reverse
+    if key is not None:
+        row_value = sa.tuple_(*keys)
+        bound = sa.tuple_(*[sa.literal(v, type_=k.type) for v, k in zip(key, keys)])
+        stmt = stmt.where(row_value < bound if desc else row_value > bound)
+
+    order = [k.desc() if desc else k.asc() for k in keys]
+    labels = [k.label(f'_key{i}') for i, k in enumerate(keys)]
+    stmt = stmt.add_columns(*labels).order_by(*order).limit(per_page + 1)
+    rows = db.session.execute(stmt).all()
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if reverse:
+        rows.reverse()
+
+    n = len(keys)
+    items = [row[0] if scalars else row[:-n] for row in rows]
+    row_keys = [list(row[-n:]) for row in rows]
+
+    if total is None and key is None and count_stmt is not None:
+        total = db.session.execute(count_stmt).scalar() or 0
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if (more and not reverse) or (reverse and key is not None):
+            next_cursor = encode_cursor(row_keys[-1], 'next', total)
+        if (key is not None and not reverse) or (reverse and more):
+            prev_cursor = encode_cursor(row_keys[0], 'prev', total)
+    return KeysetPage(items, next_cursor, prev_cursor, total, per_page)
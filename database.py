@@ -0,0 +1,77 @@
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Настройка движков БД из конфига: PRAGMA для SQLite, пул для серверных баз
+# и чтение с реплики для помеченных @read_only вьюх.
+
+
+def engine_options(url, config):
+    if make_url(url).get_backend_name() == 'sqlite':
+        return {}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_pre_ping': True,
+    }
+
+
+def configure_database(app):
+    """Вызывать до db.init_app(app)."""
+    config = app.config
+    if not config.get('SQLALCHEMY_DATABASE_URI'):
+        # ProductionConfig берёт адрес только из окружения, запасной базы нет
+        raise RuntimeError('Не задан адрес базы данных: укажите переменную окружения DATABASE_URL')
+    config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(config['SQLALCHEMY_DATABASE_URI'], config))
+    replica = config.get('DATABASE_REPLICA_URL')
+    if replica:
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        binds['replica'] = {'url': replica, **engine_options(replica, config)}
+        config['SQLALCHEMY_BINDS'] = binds
+
+
+def init_sqlite_pragmas(app, db):
+    """Вызывать после db.init_app(app), до первого соединения."""
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    if not pragmas:
+        return
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name != 'sqlite':
+            continue
+
+        @event.listens_for(engine, 'connect')
+        def _set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+            cursor.close()
+
+
+class RoutingSession(Session):
+    """Внутри @read_only вьюх SELECT'ы уходят на реплику (bind 'replica'), всё остальное - в основную базу."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_app_context()
+                and g.get('use_replica') and 'replica' in self._db.engines
+                and (clause is None or isinstance(clause, sa.sql.Select))):
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(f):
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        g.use_replica = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g.use_replica = False
+    return wrapper
@@ -0,0 +1,121 @@
+import json
+from datetime import timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape, quoteattr
+
+from flask import current_app, request, stream_with_context, url_for
+from sqlalchemy.orm import defer, joinedload
+
+from models import db, ArticleModel
+from render import ensure_rendered
+from tags import tag_filter
+
+# Ленты RSS 2.0 / Atom 1.0 / JSON Feed 1.1 по опубликованным статьям.
+# Статьи выбираются одним запросом по индексу (status, created_at),
+# тело ленты отдаётся генератором кусками; кэш и 304 - через cached_page.
+
+FORMATS = {
+    'rss': 'application/rss+xml',
+    'atom': 'application/atom+xml',
+    'json': 'application/feed+json',
+}
+
+
+def feed_articles(category=None, author_id=None, tag=None):
+    stmt = (
+        db.select(ArticleModel)
+        .options(joinedload(ArticleModel.author), defer(ArticleModel.content))
+        .filter_by(status='published')
+        .order_by(ArticleModel.created_at.desc(), ArticleModel.id.desc())
+        .limit(current_app.config['FEED_SIZE'])
+    )
+    if category:
+        stmt = stmt.filter_by(category=category)
+    if author_id:
+        stmt = stmt.filter_by(author_id=author_id)
+    if tag:
+        stmt = stmt.filter(tag_filter(tag))
+    articles = db.session.execute(stmt).scalars().all()
+    # До начала стрима: генераторы читают только content_html, без ленивых загрузок
+    ensure_rendered(articles)
+    return articles
+
+
+def _utc(value):
+    return value.replace(tzinfo=timezone.utc)
+
+
+def _rss(title, link, articles):
+    yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    yield '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:dc="http://purl.org/dc/elements/1.1/"><channel>'
+    yield f'<title>{escape(title)}</title><link>{escape(link)}</link><description>{escape(title)}</description>'
+    yield f'<atom:link href={quoteattr(request.url)} rel="self" type="application/rss+xml"/>'
+    if articles:
+        yield f'<lastBuildDate>{format_datetime(_utc(articles[0].created_at))}</lastBuildDate>'
+    for article in articles:
+        url = url_for('main.view_article', id=article.id, _external=True)
+        yield (
+            f'<item><title>{escape(article.title)}</title><link>{escape(url)}</link>'
+            f'<guid isPermaLink="true">{escape(url)}</guid>'
+            f'<pubDate>{format_datetime(_utc(article.created_at))}</pubDate>'
+            f'<dc:creator>{escape(article.author.username)}</dc:creator>'
+            f'<category>{escape(article.category)}</category>'
+            f'<description>{escape(article.content_html)}</description></item>'
+        )
+    yield '</channel></rss>\n'
+
+
+def _atom(title, link, articles):
+    updated = max((a.updated_at or a.created_at for a in articles), default=None)
+    yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    yield '<feed xmlns="http://www.w3.org/2005/Atom">'
+    yield f'<id>{escape(request.url)}</id><title>{escape(title)}</title>'
+    yield f'<link href={quoteattr(link)}/><link rel="self" href={quoteattr(request.url)}/>'
+    if updated:
+        yield f'<updated>{_utc(updated).isoformat()}</updated>'
+    for article in articles:
+        url = url_for('main.view_article', id=article.id, _external=True)
+        yield (
+            f'<entry><id>{escape(url)}</id><title>{escape(article.title)}</title>'
+            f'<link href={quoteattr(url)}/>'
+            f'<published>{_utc(article.created_at).isoformat()}</published>'
+            f'<updated>{_utc(article.updated_at or article.created_at).isoformat()}</updated>'
+            f'<author><name>{escape(article.author.username)}</name></author>'
+            f'<category term={quoteattr(article.category)}/>'
+            f'<content type="html">{escape(article.content_html)}</content></entry>'
+        )
+    yield '</feed>\n'
+
+
+def _json(title, link, articles):
+    head = json.dumps({
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': title,
+        'home_page_url': link,
+        'feed_url': request.url,
+    }, ensure_ascii=False)
+    yield head[:-1] + ', "items": ['
+    for i, article in enumerate(articles):
+        url = url_for('main.view_article', id=article.id, _external=True)
+        item = {
+            'id': url,
+            'url': url,
+            'title': article.title,
+            'content_html': article.content_html,
+            'date_published': _utc(article.created_at).isoformat(),
+            'date_modified': _utc(article.updated_at or article.created_at).isoformat(),
+            'authors': [{'name': article.author.username}],
+            'tags': [article.category],
+        }
+        yield (',' if i else '') + json.dumps(item, ensure_ascii=False)
+    yield ']}\n'
+
+
+RENDERERS = {'rss': _rss, 'atom': _atom, 'json': _json}
+
+
+def feed_response(fmt, title, articles):
+    """Ответ с лентой; статьи уже загружены, генератор только форматирует."""
+    link = url_for('main.home_page', _external=True)
+    body = RENDERERS[fmt](title, link, articles)
+    return current_app.response_class(stream_with_context(body), mimetype=FORMATS[fmt])
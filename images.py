@@ -0,0 +1,110 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from models import db, ArticleModel, UserModel
+from currentuser import user_cache
+from pagecache import page_cache
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # без Pillow отдаём оригиналы
+    Image = None
+
+# Фоновая обработка загруженных картинок: уменьшенные копии в WebP.
+# Пока копии не готовы (или Pillow не установлен), шаблоны показывают оригинал.
+
+VARIANTS = {
+    'thumb': (160, 160),
+    'card': (640, 640),
+    'full': (1600, 1600),
+}
+WEBP_QUALITY = 80
+
+_executor = None
+
+
+def _get_executor(app):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=app.config.get('IMAGE_WORKERS', 2),
+                                       thread_name_prefix='images')
+    return _executor
+
+
+def wait_pending():
+    """Дождаться поставленных в очередь задач нарезки картинок (при остановке процесса)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def variant_name(filename, variant):
+    stem = filename.rsplit('.', 1)[0]
+    return f'{stem}_{variant}.webp'
+
+
+def make_variants(folder, filename):
+    """Создаёт все варианты для folder/filename, возвращает {variant: имя файла}."""
+    if Image is None:
+        return {}
+    # Одинаковые файлы хранятся один раз (storage.py) - копии могут уже быть
+    existing = {v: variant_name(filename, v) for v in VARIANTS}
+    if all(os.path.exists(os.path.join(folder, name)) for name in existing.values()):
+        return existing
+    variants = {}
+    with Image.open(os.path.join(folder, filename)) as src:
+        img = ImageOps.exif_transpose(src)
+        img = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        for variant, size in VARIANTS.items():
+            copy = img.copy()
+            copy.thumbnail(size, Image.LANCZOS)
+            name = variant_name(filename, variant)
+            copy.save(os.path.join(folder, name), 'WEBP', quality=WEBP_QUALITY, method=4)
+            variants[variant] = name
+    return variants
+
+
+def _process(app, kind, obj_id, filename):
+    with app.app_context():
+        if kind == 'article':
+            model, column, target, folder = (ArticleModel, ArticleModel.articles_img,
+                                              'img_variants', app.config['ARTICLE_UPLOAD_FOLDER'])
+        else:
+            model, column, target, folder = (UserModel, UserModel.avatar,
+                                             'avatar_variants', app.config['UPLOAD_FOLDER'])
+        try:
+            variants = make_variants(folder, filename)
+        except Exception as e:
+            app.logger.warning('Не удалось обработать %s: %s', filename, e)
+            return
+        if not variants:
+            return
+
+        values = {getattr(model, target): variants}
+        if model is ArticleModel:
+            values[ArticleModel.updated_at] = ArticleModel.updated_at
+        # Картинку могли уже заменить - обновляем, только если она всё ещё та же
+        result = db.session.execute(
+            db.update(model).where(model.id == obj_id, column == filename).values(values)
+        )
+        db.session.commit()
+        if not result.rowcount:
+            from storage import release_upload
+            release_upload(folder, filename, column)
+            return
+        if kind == 'article':
+            page_cache.invalidate(f'article:{obj_id}')
+        else:
+            page_cache.invalidate('users')
+            user_cache.invalidate(obj_id)
+
+
+def schedule_variants(app, kind, obj_id, filename):
+    """kind - 'article' или 'avatar'. Вызывать после commit."""
+    if Image is None or not filename:
+        return
+    if app.config.get('IMAGE_WORKERS', 2) <= 0:
+        _process(app, kind, obj_id, filename)
+    else:
+        _get_executor(app).submit(_process, app, kind, obj_id, filename)
@@ -0,0 +1,53 @@
+"""Add excerpt to articles
+
+Revision ID: 1b7e2d4f8a63
+Revises: 0a6e4c9b1d52
+Create Date: 2025-10-10 11:05:27.640318
+
+"""
+import html
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b7e2d4f8a63'
+down_revision = '0a6e4c9b1d52'
+branch_labels = None
+depends_on = None
+
+
+# Копия models.make_excerpt на момент миграции
+def make_excerpt(content, length=200):
+    text = ' '.join(html.unescape(re.sub(r'<[^>]*>', ' ', content or '')).split())
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(' ', 1)[0] + '…'
+
+
+def upgrade():
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('excerpt', sa.String(length=255), nullable=True))
+
+    # Заполняем пачками, не загружая все статьи в память
+    conn = op.get_bind()
+    articles = sa.table('articles', sa.column('id', sa.Integer), sa.column('content', sa.Text),
+                        sa.column('excerpt', sa.String))
+    update = articles.update().where(articles.c.id == sa.bindparam('b_id')).values(excerpt=sa.bindparam('b_excerpt'))
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(articles.c.id, articles.c.content)
+            .where(articles.c.id > last_id).order_by(articles.c.id).limit(1000)
+        ).all()
+        if not rows:
+            break
+        conn.execute(update, [{'b_id': r.id, 'b_excerpt': make_excerpt(r.content)} for r in rows])
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.drop_column('excerpt')
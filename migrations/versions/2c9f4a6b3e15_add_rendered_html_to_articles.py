@@ -0,0 +1,30 @@
+"""Add content_html and render_version to articles
+
+Revision ID: 2c9f4a6b3e15
+Revises: 1b7e2d4f8a63
+Create Date: 2025-10-11 16:32:08.215944
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c9f4a6b3e15'
+down_revision = '1b7e2d4f8a63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Заполнять не нужно: статьи без content_html перерисуются при первом
+    # просмотре, или сразу все - flask articles-rerender
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_html', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('render_version', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.drop_column('render_version')
+        batch_op.drop_column('content_html')
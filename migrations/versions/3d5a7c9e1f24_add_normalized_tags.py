@@ -0,0 +1,79 @@
+"""Add tags and article_tags
+
+Revision ID: 3d5a7c9e1f24
+Revises: 2c9f4a6b3e15
+Create Date: 2025-10-12 10:41:53.772031
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d5a7c9e1f24'
+down_revision = '2c9f4a6b3e15'
+branch_labels = None
+depends_on = None
+
+
+# Копия tags.parse_tags на момент миграции
+def parse_tags(value):
+    names = []
+    for part in (value or '').split(','):
+        name = ' '.join(part.strip().lstrip('#').lower().split())[:50]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def upgrade():
+    tags = op.create_table('tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('article_count', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    with op.batch_alter_table('tags', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tags_article_count'), ['article_count'], unique=False)
+
+    article_tags = op.create_table('article_tags',
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('article_id', 'tag_id')
+    )
+    with op.batch_alter_table('article_tags', schema=None) as batch_op:
+        batch_op.create_index('ix_article_tags_tag_article', ['tag_id', 'article_id'], unique=False)
+
+    # Разбираем существующие строки tags; счётчики - по опубликованным статьям
+    conn = op.get_bind()
+    articles = sa.table('articles', sa.column('id', sa.Integer), sa.column('tags', sa.String),
+                        sa.column('status', sa.String))
+    tag_ids = {}
+    counts = {}
+    links = []
+    for article_id, value, status in conn.execute(sa.select(articles.c.id, articles.c.tags, articles.c.status)):
+        for name in parse_tags(value):
+            if name not in tag_ids:
+                tag_ids[name] = len(tag_ids) + 1
+                counts[name] = 0
+            if status == 'published':
+                counts[name] += 1
+            links.append({'article_id': article_id, 'tag_id': tag_ids[name]})
+    if tag_ids:
+        op.bulk_insert(tags, [{'id': tag_id, 'name': name, 'article_count': counts[name]}
+                              for name, tag_id in tag_ids.items()])
+        op.bulk_insert(article_tags, links)
+
+
+def downgrade():
+    with op.batch_alter_table('article_tags', schema=None) as batch_op:
+        batch_op.drop_index('ix_article_tags_tag_article')
+
+    op.drop_table('article_tags')
+    with op.batch_alter_table('tags', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tags_article_count'))
+
+    op.drop_table('tags')
@@ -0,0 +1,38 @@
+"""Add article_scores for trending feed
+
+Revision ID: 4e8b1d3f6a97
+Revises: 3d5a7c9e1f24
+Create Date: 2025-10-13 18:22:40.519304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e8b1d3f6a97'
+down_revision = '3d5a7c9e1f24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Заполняется фоновым пересчётом или flask trending-refresh --full
+    op.create_table('article_scores',
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('view_score', sa.Float(), nullable=True),
+        sa.Column('views_seen', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('article_id')
+    )
+    with op.batch_alter_table('article_scores', schema=None) as batch_op:
+        batch_op.create_index('ix_article_scores_score', ['score', 'article_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('article_scores', schema=None) as batch_op:
+        batch_op.drop_index('ix_article_scores_score')
+
+    op.drop_table('article_scores')
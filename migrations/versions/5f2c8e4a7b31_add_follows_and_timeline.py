@@ -0,0 +1,60 @@
+"""Add follows and timeline_entries for home timeline
+
+Revision ID: 5f2c8e4a7b31
+Revises: 4e8b1d3f6a97
+Create Date: 2025-10-14 11:05:12.733920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f2c8e4a7b31'
+down_revision = '4e8b1d3f6a97'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('follower_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.create_table('follows',
+        sa.Column('follower_id', sa.Integer(), nullable=False),
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['follower_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('follower_id', 'author_id')
+    )
+    with op.batch_alter_table('follows', schema=None) as batch_op:
+        batch_op.create_index('ix_follows_author_follower', ['author_id', 'follower_id'], unique=False)
+
+    # Лента заполняется при публикации статей и при подписке
+    op.create_table('timeline_entries',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'article_id')
+    )
+    with op.batch_alter_table('timeline_entries', schema=None) as batch_op:
+        batch_op.create_index('ix_timeline_user_created', ['user_id', 'created_at', 'article_id'], unique=False)
+        batch_op.create_index('ix_timeline_article', ['article_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('timeline_entries', schema=None) as batch_op:
+        batch_op.drop_index('ix_timeline_article')
+        batch_op.drop_index('ix_timeline_user_created')
+
+    op.drop_table('timeline_entries')
+    with op.batch_alter_table('follows', schema=None) as batch_op:
+        batch_op.drop_index('ix_follows_author_follower')
+
+    op.drop_table('follows')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('follower_count')
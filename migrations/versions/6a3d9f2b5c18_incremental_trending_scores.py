@@ -0,0 +1,45 @@
+"""Incremental trending: event score and last seen like/comment ids
+
+Revision ID: 6a3d9f2b5c18
+Revises: 5f2c8e4a7b31
+Create Date: 2025-10-15 09:41:27.214806
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a3d9f2b5c18'
+down_revision = '5f2c8e4a7b31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # event_score пустой - первый пересчёт статьи прочитает её события с начала
+    with op.batch_alter_table('article_scores', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('event_score', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('last_like_id', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('last_comment_id', sa.Integer(), server_default='0', nullable=False))
+
+    with op.batch_alter_table('article_likes', schema=None) as batch_op:
+        batch_op.drop_index('ix_article_likes_article_id')
+        batch_op.create_index('ix_article_likes_article_id', ['article_id', 'id'], unique=False)
+
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.create_index('ix_comments_article_id', ['article_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_index('ix_comments_article_id')
+
+    with op.batch_alter_table('article_likes', schema=None) as batch_op:
+        batch_op.drop_index('ix_article_likes_article_id')
+        batch_op.create_index('ix_article_likes_article_id', ['article_id'], unique=False)
+
+    with op.batch_alter_table('article_scores', schema=None) as batch_op:
+        batch_op.drop_column('last_comment_id')
+        batch_op.drop_column('last_like_id')
+        batch_op.drop_column('event_score')
@@ -0,0 +1,60 @@
+"""Add articles_fts full-text index
+
+Revision ID: c41f2a9e7d10
+Revises: b78df69d7e76
+Create Date: 2025-10-02 18:41:12.304518
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f2a9e7d10'
+down_revision = 'b78df69d7e76'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 есть только в SQLite, на других базах поиск идёт через LIKE
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+            title, content, tags,
+            content='articles', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS articles_fts_ai AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts(rowid, title, content, tags)
+            VALUES (new.id, new.title, new.content, new.tags);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS articles_fts_ad AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts(articles_fts, rowid, title, content, tags)
+            VALUES ('delete', old.id, old.title, old.content, old.tags);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS articles_fts_au AFTER UPDATE OF title, content, tags ON articles BEGIN
+            INSERT INTO articles_fts(articles_fts, rowid, title, content, tags)
+            VALUES ('delete', old.id, old.title, old.content, old.tags);
+            INSERT INTO articles_fts(rowid, title, content, tags)
+            VALUES (new.id, new.title, new.content, new.tags);
+        END
+    """)
+    op.execute("INSERT INTO articles_fts(articles_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS articles_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS articles_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS articles_fts_ai")
+    op.execute("DROP TABLE IF EXISTS articles_fts")
@@ -0,0 +1,35 @@
+"""Add like_count and comment_count to articles
+
+Revision ID: d2a8b5c0e913
+Revises: c41f2a9e7d10
+Create Date: 2025-10-03 12:17:45.118206
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a8b5c0e913'
+down_revision = 'c41f2a9e7d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('like_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Заполняем счётчики по существующим лайкам и комментариям
+    op.execute("""
+        UPDATE articles SET
+            like_count = (SELECT COUNT(*) FROM article_likes WHERE article_likes.article_id = articles.id),
+            comment_count = (SELECT COUNT(*) FROM comments WHERE comments.article_id = articles.id)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.drop_column('comment_count')
+        batch_op.drop_column('like_count')
@@ -0,0 +1,27 @@
+"""Add views to articles
+
+Revision ID: f1a9d3e6c207
+Revises: e5c71f3a2b48
+Create Date: 2025-10-07 11:26:51.830442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a9d3e6c207'
+down_revision = 'e5c71f3a2b48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 96acd07b83db обещал views в названии, но колонку так и не добавил
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('views', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.drop_column('views')
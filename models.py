@@ -1,11 +1,14 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
 from datetime import datetime
+import html
+import re
+from passwords import hasher
+from database import RoutingSession
 from sqlalchemy.sql import func
+from sqlalchemy.orm import validates
 from flask import url_for
 
-bcrypt = Bcrypt()
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class UserModel(db.Model):
     __tablename__ = 'users'
@@ -15,20 +18,29 @@ class UserModel(db.Model):
     email = db.Column(db.String(80), unique=True, nullable=False)
     age = db.Column(db.Integer(), nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
-    articles = db.relationship('ArticleModel', backref='author', lazy=True)
-    avatar = db.Column(db.String(255), default='default.png')
+    articles = db.relationship('ArticleModel', back_populates='author', lazy=True)
+    avatar = db.Column(db.String(255), default='default.png', index=True)
+    # {'thumb': ..., 'card': ..., 'full': ...} - WebP копии, см. images.py
+    avatar_variants = db.Column(db.JSON, nullable=True)
+    # Денормализованный счётчик подписчиков, меняется в timeline.follow/unfollow
+    follower_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
-    def get_avatar_url(self):
+    def get_avatar_url(self, variant=None):
         if self.avatar and self.avatar != 'default.png':
-            return url_for('static', filename=f'uploads/avatars/{self.avatar}')
+            filename = (self.avatar_variants or {}).get(variant) or self.avatar
+            return url_for('main.uploaded_file', kind='avatars', filename=filename)
         else:
             return url_for('static', filename='default.png')  # Make sure you have this file
     
+    # bcrypt считается в пуле процессов (passwords.py), стоимость - BCRYPT_LOG_ROUNDS
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = hasher.hash(password)
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return hasher.check(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return hasher.needs_rehash(self.password_hash)
 
     def __repr__(self):
         return f'User : {self.username}'
@@ -40,27 +52,176 @@ class UserModel(db.Model):
 #     date_created = db.Column(db.DateTime, server_default=func.now())
 
 
+EXCERPT_LENGTH = 200
+
+
+def make_excerpt(content, length=EXCERPT_LENGTH):
+    # Текст без тегов, обрезанный по границе слова
+    text = ' '.join(html.unescape(re.sub(r'<[^>]*>', ' ', content or '')).split())
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(' ', 1)[0] + '…'
+
+
+def _excerpt_default(context):
+    # Для INSERT'ов в обход ORM (bulkio, benchmark)
+    return make_excerpt(context.get_current_parameters().get('content'))
+
+
 class ArticleModel(db.Model):
     __tablename__ = 'articles'
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
+    # Для списков статей, чтобы не тянуть content (см. make_excerpt)
+    excerpt = db.Column(db.String(255), default=_excerpt_default)
+    # Очищенный HTML для view_article и лент, см. render.py
+    content_html = db.Column(db.Text, nullable=True)
+    render_version = db.Column(db.Integer, nullable=True)
     category = db.Column(db.String(50), nullable=False)
     status = db.Column(db.String(20), default='draft')  
     tags = db.Column(db.String(500)) 
     articles_img = db.Column(db.String(255), nullable=True)
+    img_variants = db.Column(db.JSON, nullable=True)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     author_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+
+    # Денормализованные счётчики, обновляются в like_article / add_comment / delete_comment
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Пишется пачками из viewcounter.py, может отставать на VIEW_FLUSH_INTERVAL
+    views = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
+    author = db.relationship('UserModel', back_populates='articles')
     likes = db.relationship('LikeModel', back_populates='article', cascade='all, delete-orphan')
     comments = db.relationship('CommentModel', back_populates='article', cascade='all, delete-orphan')
+    # Нормализованные теги; строка tags - то, что показываем в форме (см. tags.py)
+    tag_list = db.relationship('TagModel', secondary='article_tags', order_by='TagModel.name')
+
+    # Индексы под запросы из app.py (см. flask check-query-plans)
+    __table_args__ = (
+        db.Index('ix_articles_author_created', 'author_id', 'created_at', 'id'),
+        db.Index('ix_articles_author_status', 'author_id', 'status'),
+        db.Index('ix_articles_status_created', 'status', 'created_at', 'id'),
+        db.Index('ix_articles_status_category_created', 'status', 'category', 'created_at', 'id'),
+        db.Index('ix_articles_articles_img', 'articles_img'),
+    )
+
+    @validates('content')
+    def _update_excerpt(self, key, content):
+        self.excerpt = make_excerpt(content)
+        return content
+
+    @classmethod
+    def adjust_counter(cls, article_id, column, delta):
+        # Атомарный UPDATE ... SET x = x + delta, без чтения строки.
+        # updated_at оставляем как есть - лайк не правка статьи (иначе сработает onupdate)
+        counter = getattr(cls, column)
+        db.session.execute(
+            db.update(cls).where(cls.id == article_id)
+            .values({counter: counter + delta, cls.updated_at: cls.updated_at})
+        )
+
+    @classmethod
+    def recount_counters(cls):
+        likes = db.select(db.func.count(LikeModel.id)).where(LikeModel.article_id == cls.id).scalar_subquery()
+        comments = db.select(db.func.count(CommentModel.id)).where(CommentModel.article_id == cls.id).scalar_subquery()
+        result = db.session.execute(db.update(cls).values(like_count=likes, comment_count=comments, updated_at=cls.updated_at))
+        return result.rowcount
+
+    def get_image_url(self, variant=None):
+        if not self.articles_img:
+            return None
+        filename = (self.img_variants or {}).get(variant) or self.articles_img
+        return url_for('main.uploaded_file', kind='articles', filename=filename)
+
+    def is_liked_by(self, user_id):
+        if not user_id:
+            return False
+        return db.session.query(
+            LikeModel.query.filter_by(user_id=user_id, article_id=self.id).exists()
+        ).scalar()
+
     def __repr__(self):
         return f'<Article {self.title}>'
     
 
+article_tags = db.Table(
+    'article_tags',
+    db.Column('article_id', db.Integer, db.ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
+    # Статьи по тегу: поиск по tag_id без обращения к articles
+    db.Index('ix_article_tags_tag_article', 'tag_id', 'article_id'),
+)
+
+
+class TagModel(db.Model):
+    __tablename__ = 'tags'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    # Число опубликованных статей с тегом, ведётся в tags.update_article_tags
+    article_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
+
+    def __repr__(self):
+        return f'<Tag {self.name}>'
+
+
+class ArticleScoreModel(db.Model):
+    """Снимок оценок для ленты "В тренде", пишется только из trending.py."""
+    __tablename__ = 'article_scores'
+
+    article_id = db.Column(db.Integer, db.ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True)
+    # log2 суммы затухающих весов, можно сравнивать между собой в любой момент
+    score = db.Column(db.Float, nullable=False)
+    # Часть оценки от публикации, лайков и комментариев и id последних учтённых событий:
+    # пересчёт домешивает только лайки/комментарии новее last_*_id
+    event_score = db.Column(db.Float, nullable=True)
+    last_like_id = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_comment_id = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Часть оценки от просмотров: у просмотров нет времени, копим по мере сброса счётчика
+    view_score = db.Column(db.Float, nullable=True)
+    views_seen = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    article = db.relationship('ArticleModel')
+
+    __table_args__ = (
+        db.Index('ix_article_scores_score', 'score', 'article_id'),
+    )
+
+
+class FollowModel(db.Model):
+    __tablename__ = 'follows'
+
+    follower_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    author_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # PK (follower_id, author_id) - на кого подписан; индекс ниже - подписчики автора для fan-out
+    __table_args__ = (
+        db.Index('ix_follows_author_follower', 'author_id', 'follower_id'),
+    )
+
+
+class TimelineEntryModel(db.Model):
+    """Домашняя лента: строка на (читатель, статья), заполняется fan-out'ом в timeline.py."""
+    __tablename__ = 'timeline_entries'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    article_id = db.Column(db.Integer, db.ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True)
+    author_id = db.Column(db.Integer, nullable=False)
+    # Копия articles.created_at: лента читается одним диапазоном по индексу
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_timeline_user_created', 'user_id', 'created_at', 'article_id'),
+        db.Index('ix_timeline_article', 'article_id'),
+    )
+
+
 class LikeModel(db.Model):
     __tablename__ = 'article_likes'
 
@@ -71,7 +232,11 @@ class LikeModel(db.Model):
     user = db.relationship('UserModel', backref='liked_articles')
     article = db.relationship('ArticleModel', back_populates='likes')
 
-    __table_args__ = (db.UniqueConstraint('user_id', 'article_id', name='_user_article_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'article_id', name='_user_article_uc'),
+        # id во второй колонке - новые лайки статьи (id > последнего учтённого) для трендов
+        db.Index('ix_article_likes_article_id', 'article_id', 'id'),
+    )
 
 
 class CommentModel(db.Model):
@@ -84,3 +249,8 @@ class CommentModel(db.Model):
     article_id = db.Column(db.Integer, db.ForeignKey('articles.id'), nullable=False)
     user = db.relationship('UserModel', backref='comments')
     article = db.relationship('ArticleModel', back_populates='comments')
+
+    __table_args__ = (
+        db.Index('ix_comments_article_created', 'article_id', 'created_at', 'id'),
+        db.Index('ix_comments_article_id', 'article_id', 'id'),
+    )
@@ -0,0 +1,212 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+
+# Кэш отрендеренных страниц.
+# Ключ = endpoint + аргументы + id зрителя + "поколения" зависимостей
+# (article:<id>, listings, users). Инвалидация = новое поколение, старые
+# записи просто перестают находиться и вытесняются по LRU/TTL.
+# LRU живёт в памяти процесса; при нескольких процессах используйте
+# filesystem, иначе инвалидация будет видна только одному из них.
+
+
+class NullCache:
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+
+class LRUCache:
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires and expires < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl else 0
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class FileSystemCache:
+    # Страницы старых поколений больше никто не читает, поэтому get их не удалит:
+    # раз в sweep_every записей set чистит каталог - просроченные по mtime и самые
+    # старые сверх max_entries. Файлы поколений (gen:) не вытесняются.
+
+    def __init__(self, directory, ttl=300, max_entries=1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sweep_every = max(1, max_entries // 10)
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        name = hashlib.sha1(key.encode()).hexdigest()
+        if key.startswith('gen:'):
+            name = 'gen-' + name
+        return os.path.join(self.directory, name)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                expires, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if expires and expires < time.time():
+            self.delete(key)
+            return None
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl else 0
+        # Пишем во временный файл и переименовываем - читатель не увидит половину записи
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((expires, value), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._path(key))
+        with self._lock:
+            self._writes += 1
+            sweep = self._writes % self.sweep_every == 0
+        if sweep:
+            self.sweep()
+
+    def sweep(self):
+        """Удалить просроченные записи и самые старые сверх max_entries."""
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.directory):
+            # gen- - поколения, tmp - недописанные файлы mkstemp
+            if entry.name.startswith(('gen-', 'tmp')):
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            if self.ttl and mtime + self.ttl < now:
+                self._remove(entry.path)
+            else:
+                entries.append((mtime, entry.path))
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_entries)]:
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def delete(self, key):
+        self._remove(self._path(key))
+
+
+class PageCache:
+    def __init__(self):
+        self.backend = NullCache()
+
+    def init_app(self, app):
+        kind = app.config.get('PAGE_CACHE_TYPE', 'lru')
+        ttl = app.config.get('PAGE_CACHE_TTL', 300)
+        if kind == 'lru':
+            self.backend = LRUCache(app.config.get('PAGE_CACHE_MAX_ENTRIES', 1024), ttl)
+        elif kind == 'filesystem':
+            directory = app.config.get('PAGE_CACHE_DIR') or os.path.join(app.instance_path, 'page_cache')
+            self.backend = FileSystemCache(directory, ttl, app.config.get('PAGE_CACHE_MAX_ENTRIES', 1024))
+        else:
+            self.backend = NullCache()
+
+    def generation(self, name):
+        gen = self.backend.get(f'gen:{name}')
+        if gen is None:
+            gen = time.time()
+            # Поколения живут дольше страниц, чтобы не сбрасывать кэш лишний раз
+            self.backend.set(f'gen:{name}', gen, ttl=0)
+        return gen
+
+    def invalidate(self, *names):
+        for name in names:
+            self.backend.set(f'gen:{name}', time.time(), ttl=0)
+
+
+page_cache = PageCache()
+
+
+def cached_page(*dependencies, public=False):
+    """Кэширует GET ответ вьюхи. dependencies - строки или функции от kwargs вьюхи,
+    возвращающие имя поколения, например lambda id: f'article:{id}'.
+    public=True - ответ одинаков для всех (ленты), ключ не зависит от зрителя."""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            # Flash сообщения рендерятся в страницу - такие ответы не кэшируем (ленты их не показывают)
+            flashes = not public and '_flashes' in session
+            if request.method != 'GET' or flashes or isinstance(page_cache.backend, NullCache):
+                return f(*args, **kwargs)
+
+            names = [d(**kwargs) if callable(d) else d for d in dependencies]
+            gens = [page_cache.generation(name) for name in names]
+            key = '|'.join([
+                request.endpoint,
+                repr(sorted(kwargs.items())),
+                repr(sorted(request.args.items(multi=True))),
+                '' if public else str(session.get('user_id', 0)),
+                repr(gens),
+            ])
+            etag = hashlib.sha1(key.encode()).hexdigest()
+            last_modified = datetime.fromtimestamp(int(max(gens)), timezone.utc)
+
+            entry = page_cache.backend.get(f'page:{key}')
+            if entry is None:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200 or (not public and '_flashes' in session):
+                    return response
+                entry = (response.get_data(), response.mimetype)
+                page_cache.backend.set(f'page:{key}', entry)
+            else:
+                response = current_app.response_class(entry[0], mimetype=entry[1])
+
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            # Страница зависит от пользователя - только приватный кэш с проверкой
+            response.headers['Cache-Control'] = 'public, no-cache' if public else 'private, no-cache'
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
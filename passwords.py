@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+import bcrypt
+from flask import current_app
+
+# Хэширование паролей вне потока запроса: bcrypt считается в отдельных
+# процессах, очередь ограничена. Если пул занят - PasswordHasherBusy (503),
+# а не зависшие на секунды воркеры для всех остальных страниц.
+
+DEFAULT_ROUNDS = 12
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password_hash, password):
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+class PasswordHasher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self._slots = None
+
+    def _config(self):
+        config = current_app.config
+        return (config.get('BCRYPT_LOG_ROUNDS', DEFAULT_ROUNDS),
+                config.get('PASSWORD_HASH_WORKERS', 2),
+                config.get('PASSWORD_HASH_QUEUE', 16),
+                config.get('PASSWORD_HASH_TIMEOUT', 30))
+
+    def _get_pool(self, workers, queue):
+        # Пул создаётся лениво и заново после fork (у дочернего процесса свой)
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+                self._pid = os.getpid()
+                self._slots = threading.BoundedSemaphore(workers + queue)
+            return self._pool
+
+    def _run(self, fn, *args):
+        _, workers, queue, timeout = self._config()
+        if workers <= 0:
+            return fn(*args)
+        pool = self._get_pool(workers, queue)
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            future = pool.submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        # Слот занят, пока задача реально считается в пуле, а не пока мы её ждём:
+        # после таймаута bcrypt ещё работает, и очередь не должна расти сверх лимита
+        future.add_done_callback(lambda f: slots.release())
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            raise PasswordHasherBusy()
+
+    def hash(self, password):
+        rounds = self._config()[0]
+        return self._run(_hash, password, rounds)
+
+    def check(self, password_hash, password):
+        if not password_hash:
+            return False
+        return self._run(_check, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        # $2b$12$... - стоимость между вторым и третьим '$'
+        try:
+            cost = int(password_hash.split('$')[2])
+        except (AttributeError, IndexError, ValueError):
+            return True
+        return cost != self._config()[0]
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+hasher = PasswordHasher()
@@ -0,0 +1,164 @@
+import re
+from contextlib import contextmanager
+
+from flask import current_app
+from sqlalchemy import event
+
+from cursors import encode_cursor
+from models import db, UserModel, ArticleModel, CommentModel, LikeModel
+from pagecache import page_cache, NullCache
+from passwords import hasher
+from search import ensure_search_index
+from tags import rebuild_tags
+import timeline
+from trending import trending
+
+# Проверка планов запросов: прогоняем маршруты через test client, ловим
+# все SELECT'ы и смотрим EXPLAIN QUERY PLAN. Полный проход по таблице
+# (SCAN без индекса) на любом маршруте - ошибка. Только SQLite.
+
+# (метод, url); {article}, {other} и {cursor} подставляются по данным в базе
+ROUTES = [
+    ('GET', '/home'),
+    ('GET', '/home?feed_cursor={cursor}'),
+    ('GET', '/home?q=python'),
+    ('GET', '/home?category=Наука'),
+    ('GET', '/search?q=python'),
+    ('GET', '/search?q=python&sort=newest'),
+    ('GET', '/search?category=Наука'),
+    ('GET', '/search?category=Наука&sort=oldest'),
+    ('GET', '/my-articles'),
+    ('GET', '/my-articles?cursor={cursor}'),
+    ('GET', '/search?category=Наука&cursor={cursor}'),
+    ('GET', '/search?tag=python'),
+    ('GET', '/tag/python?q=python'),
+    ('GET', '/tag/python?cursor={cursor}'),
+    ('GET', '/tags'),
+    ('GET', '/trending'),
+    ('GET', '/trending?cursor={score_cursor}'),
+    ('GET', '/profile'),
+    ('GET', '/user/{other}'),
+    ('GET', '/view-article/{article}'),
+    ('GET', '/view-article/{article}/comments'),
+    ('GET', '/feed.rss'),
+    ('GET', '/feed/category/Наука.atom'),
+    ('GET', '/feed/author/{author}.json'),
+    ('GET', '/feed/tag/python.rss'),
+    ('GET', '/api/v1/articles'),
+    ('GET', '/api/v1/articles?fields=title,excerpt&cursor={cursor}'),
+    ('GET', '/api/v1/articles?category=Наука'),
+    ('GET', '/api/v1/articles?author_id={author}'),
+    ('GET', '/api/v1/articles?tag=python'),
+    ('GET', '/api/v1/articles?ids={article},{other}'),
+    ('GET', '/api/v1/articles/{article}'),
+    ('GET', '/api/v1/articles/{article}/comments'),
+    ('GET', '/api/v1/articles/{article}/likes'),
+    ('GET', '/api/v1/users?ids={author},{other}'),
+    ('GET', '/api/v1/users/{author}'),
+    ('POST', '/like-article/{article}'),
+    ('POST', '/like-article/{article}'),
+]
+
+ALLOWED_SCANS = ('USING INDEX', 'USING COVERING INDEX', 'USING INTEGER PRIMARY KEY',
+                 'USING PRIMARY KEY', 'VIRTUAL TABLE', 'CONSTANT ROW')
+SCAN = re.compile(r'^SCAN (TABLE )?(\w+)')
+
+
+def seed_minimal(articles=30):
+    """Небольшой набор данных, если база пустая."""
+    if db.session.execute(db.select(ArticleModel.id).limit(1)).first():
+        return
+    password_hash = hasher.hash('password')
+    users = [UserModel(username=f'plan_user_{i}', email=f'plan{i}@example.com', age=30,
+                       password_hash=password_hash) for i in range(3)]
+    db.session.add_all(users)
+    db.session.flush()
+    for i in range(articles):
+        article = ArticleModel(title=f'Статья про python {i}', content='python flask sqlite ' * 50,
+                               category='Наука' if i % 2 else 'Технологии',
+                               status='published' if i % 3 else 'draft',
+                               tags='python, flask', author_id=users[i % 3].id)
+        db.session.add(article)
+        db.session.flush()
+        for user in users[:i % 3 + 1]:
+            db.session.add(LikeModel(user_id=user.id, article_id=article.id))
+            db.session.add(CommentModel(content=f'Комментарий {i}', user_id=user.id, article_id=article.id))
+    db.session.commit()
+    ArticleModel.recount_counters()
+    db.session.commit()
+    rebuild_tags()
+    trending.refresh(full=True)
+    app = current_app._get_current_object()
+    for user in users:
+        for author in users:
+            timeline.follow(app, user.id, author.id)
+
+
+@contextmanager
+def capture_selects(engine):
+    statements = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before)
+
+
+def full_scans(conn, statement, parameters):
+    plan = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    scans = []
+    for row in plan:
+        detail = row[-1]
+        match = SCAN.match(detail)
+        if match and not any(ok in detail for ok in ALLOWED_SCANS):
+            scans.append(detail)
+    return scans
+
+
+def check_query_plans(app, seed=False):
+    """Возвращает список (метод, url, SQL, [SCAN ...]) для запросов с полным сканом."""
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        raise RuntimeError('EXPLAIN QUERY PLAN проверяется только на SQLite')
+    if seed:
+        db.create_all()
+    ensure_search_index(rebuild=seed)
+    if seed:
+        seed_minimal()
+
+    article = db.session.execute(
+        db.select(ArticleModel).filter_by(status='published').order_by(ArticleModel.id)
+    ).scalars().first()
+    if article is None:
+        raise RuntimeError('В базе нет опубликованных статей, запустите с --seed')
+
+    other = db.session.execute(
+        db.select(UserModel.id).where(UserModel.id != article.author_id).limit(1)
+    ).scalar() or article.author_id
+    cursor = encode_cursor([article.created_at, article.id])
+    score_cursor = encode_cursor([0.0, article.id])
+
+    # Кэш страниц отключаем - иначе ответы придут без запросов к базе
+    backend, page_cache.backend = page_cache.backend, NullCache()
+    problems = []
+    try:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = article.author_id
+        for method, url in ROUTES:
+            url = url.format(article=article.id, author=article.author_id, other=other, cursor=cursor, score_cursor=score_cursor)
+            with capture_selects(engine) as statements:
+                client.open(url, method=method)
+            with engine.connect() as conn:
+                for statement, parameters in statements:
+                    scans = full_scans(conn, statement, parameters)
+                    if scans:
+                        problems.append((method, url, statement, scans))
+    finally:
+        page_cache.backend = backend
+    return problems
@@ -0,0 +1,102 @@
+import re
+
+import nh3
+from markupsafe import escape
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import db, ArticleModel
+
+# Подготовка HTML статьи при записи: content (то, что ввёл автор) ->
+# content_html (очищенный HTML, отдаётся в view_article как есть).
+# При изменении правил очистки поднимите RENDERER_VERSION - старые статьи
+# перерисуются при первом просмотре или через flask articles-rerender.
+
+RENDERER_VERSION = 1
+
+ALLOWED_TAGS = {
+    'p', 'br', 'hr', 'h1', 'h2', 'h3', 'h4', 'b', 'strong', 'i', 'em', 'u', 's',
+    'blockquote', 'ul', 'ol', 'li', 'a', 'code', 'pre', 'img', 'figure', 'figcaption',
+}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title'},
+    'img': {'src', 'alt', 'title'},
+}
+URL_SCHEMES = {'http', 'https', 'mailto'}
+_HAS_TAGS = re.compile(r'<[a-zA-Z/!]')
+
+
+def render_content(content):
+    """Очищенный HTML из текста статьи. Текст без тегов разбивается на абзацы."""
+    content = content or ''
+    if not _HAS_TAGS.search(content):
+        paragraphs = [p.strip() for p in re.split(r'\n\s*\n', content) if p.strip()]
+        content = ''.join(f'<p>{str(escape(p)).replace(chr(10), "<br>")}</p>' for p in paragraphs)
+    return nh3.clean(content, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES,
+                     url_schemes=URL_SCHEMES, link_rel='noopener nofollow ugc')
+
+
+def render_article(article):
+    article.content_html = render_content(article.content)
+    article.render_version = RENDERER_VERSION
+
+
+def _is_stale(article):
+    return article.render_version != RENDERER_VERSION or article.content_html is None
+
+
+def rendered_html(article):
+    """content_html статьи; устаревший (или пустой после bulk импорта) перерисовывается и сохраняется."""
+    if not _is_stale(article):
+        return article.content_html
+    html = render_content(article.content)
+    # Отдельной транзакцией, чтобы commit не сбросил загруженные объекты сессии
+    with db.engine.begin() as conn:
+        conn.execute(_update_stmt(), [{'b_id': article.id, 'b_html': html}])
+    # Объект в сессии обновляем без пометки "изменён"
+    set_committed_value(article, 'content_html', html)
+    set_committed_value(article, 'render_version', RENDERER_VERSION)
+    return html
+
+
+def ensure_rendered(articles):
+    """Перерисовать устаревшие среди уже загруженных статей (content может быть отложен):
+    один SELECT текстов и один пакетный UPDATE."""
+    stale = {article.id: article for article in articles if _is_stale(article)}
+    if not stale:
+        return
+    rows = db.session.execute(
+        db.select(ArticleModel.id, ArticleModel.content).where(ArticleModel.id.in_(stale))
+    ).all()
+    params = [{'b_id': r.id, 'b_html': render_content(r.content)} for r in rows]
+    with db.engine.begin() as conn:
+        conn.execute(_update_stmt(), params)
+    for p in params:
+        set_committed_value(stale[p['b_id']], 'content_html', p['b_html'])
+        set_committed_value(stale[p['b_id']], 'render_version', RENDERER_VERSION)
+
+
+def _update_stmt():
+    # updated_at оставляем как есть - перерисовка не правка статьи
+    table = ArticleModel.__table__
+    return (
+        table.update()
+        .where(table.c.id == db.bindparam('b_id'))
+        .values(content_html=db.bindparam('b_html'), render_version=RENDERER_VERSION,
+                updated_at=table.c.updated_at)
+    )
+
+
+def rerender_stale(batch_size=500):
+    """Перерисовать все устаревшие статьи пачками, вернуть их число."""
+    stale = db.or_(ArticleModel.render_version.is_(None), ArticleModel.render_version != RENDERER_VERSION)
+    total = 0
+    while True:
+        rows = db.session.execute(
+            db.select(ArticleModel.id, ArticleModel.content).where(stale)
+            .order_by(ArticleModel.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return total
+        db.session.execute(_update_stmt(), [{'b_id': r.id, 'b_html': render_content(r.content)} for r in rows])
+        db.session.commit()
+        total += len(rows)
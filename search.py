@@ -0,0 +1,168 @@
+import re
+
+import sqlalchemy as sa
+from sqlalchemy.orm import defer
+from markupsafe import Markup, escape
+
+from cursors import keyset_paginate
+from models import db, ArticleModel
+from tags import tag_filter
+
+# Полнотекстовый поиск по статьям.
+# На SQLite используется FTS5 (external content таблица articles_fts,
+# синхронизируется триггерами), на остальных базах - старый LIKE.
+
+FTS_TABLE = 'articles_fts'
+
+# Веса колонок для bm25: title, content, tags
+FTS_WEIGHTS = (10.0, 1.0, 5.0)
+
+_HL_OPEN = '\x02'
+_HL_CLOSE = '\x03'
+
+FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content, tags,
+        content='articles', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON articles BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content, tags)
+        VALUES (new.id, new.title, new.content, new.tags);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON articles BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content, tags)
+        VALUES ('delete', old.id, old.title, old.content, old.tags);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, content, tags ON articles BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content, tags)
+        VALUES ('delete', old.id, old.title, old.content, old.tags);
+        INSERT INTO {FTS_TABLE}(rowid, title, content, tags)
+        VALUES (new.id, new.title, new.content, new.tags);
+    END""",
+]
+
+_fts_ready = {}
+
+
+def fts_available():
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return False
+    key = str(engine.url)
+    if key not in _fts_ready:
+        _fts_ready[key] = sa.inspect(engine).has_table(FTS_TABLE)
+    return _fts_ready[key]
+
+
+def ensure_search_index(rebuild=False):
+    """Создаёт FTS-таблицу и триггеры (если их нет); rebuild=True переиндексирует все статьи."""
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return False
+    with engine.begin() as conn:
+        for ddl in FTS_DDL:
+            conn.exec_driver_sql(ddl)
+        if rebuild:
+            conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    _fts_ready[str(engine.url)] = True
+    return True
+
+
+def build_match_query(query):
+    # Каждое слово в кавычках (никакого синтаксиса FTS5 от пользователя),
+    # последнее - префиксом, чтобы поиск работал "по мере набора".
+    tokens = re.findall(r'\w+', query)
+    if not tokens:
+        return None
+    terms = [f'"{t}"' for t in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _highlight(snippet):
+    if not snippet:
+        return None
+    text = re.sub(r'<[^>]*>|<[^>]*$', '', snippet)
+    text = str(escape(text)).replace(_HL_OPEN, '<mark>').replace(_HL_CLOSE, '</mark>')
+    return Markup(text)
+
+
+class ArticleSearch:
+    """Поиск опубликованных статей; page() отдаёт страницу по курсору.
+
+    snippets - {article_id: подсветка}, заполняется только при поиске через FTS.
+    """
+
+    def __init__(self, query='', category='', sort='relevance', tag=''):
+        self.query = query
+        self.category = category
+        self.tag = tag
+        self.match = build_match_query(query) if query else None
+        self.use_fts = bool(self.match) and fts_available()
+        if sort == 'relevance' and not self.use_fts:
+            sort = 'newest'
+        self.sort = sort
+        self.snippets = {}
+
+    def _filters(self):
+        filters = [ArticleModel.status == 'published']
+        if self.category:
+            filters.append(ArticleModel.category == self.category)
+        if self.tag:
+            filters.append(tag_filter(self.tag))
+        if self.query and not self.use_fts:
+            filters.append(
+                ArticleModel.title.contains(self.query) |
+                ArticleModel.content.contains(self.query) |
+                ArticleModel.tags.contains(self.query)
+            )
+        return filters
+
+    def _base(self, *columns):
+        stmt = sa.select(*columns)
+        if self.use_fts:
+            fts = sa.table(FTS_TABLE, sa.column('rowid'))
+            stmt = stmt.join(fts, fts.c.rowid == ArticleModel.id).where(
+                sa.literal_column(FTS_TABLE).op('MATCH')(self.match)
+            )
+        elif self.query and not self.match:
+            # Запрос из одних знаков препинания - искать нечего
+            stmt = stmt.where(sa.false())
+        return stmt.where(*self._filters())
+
+    def page(self, cursor=None, per_page=10):
+        count_stmt = self._base(sa.func.count(ArticleModel.id))
+        if self.sort == 'relevance':
+            # bm25 тем меньше, чем релевантнее - сортировка по возрастанию
+            keys = [sa.func.bm25(sa.literal_column(FTS_TABLE), *FTS_WEIGHTS), ArticleModel.id]
+            descending = False
+        else:
+            keys = [ArticleModel.created_at, ArticleModel.id]
+            descending = self.sort != 'oldest'
+
+        # Спискам нужен только excerpt - content не загружаем
+        entity = self._base(ArticleModel).options(defer(ArticleModel.content))
+        if not self.use_fts:
+            return keyset_paginate(entity, keys, cursor, per_page,
+                                   descending, count_stmt)
+
+        snippet = sa.func.snippet(sa.literal_column(FTS_TABLE), 1, _HL_OPEN, _HL_CLOSE, '…', 24)
+        result = keyset_paginate(entity.add_columns(snippet), keys, cursor, per_page,
+                                 descending, count_stmt, scalars=False)
+        items = []
+        for article, snip in result.items:
+            items.append(article)
+            self.snippets[article.id] = _highlight(snip)
+        result.items = items
+        return result
+
+
+def search_articles(query='', category='', sort=None, cursor=None, per_page=10, tag=''):
+    if sort not in ('relevance', 'newest', 'oldest'):
+        sort = 'relevance' if query else 'newest'
+    search = ArticleSearch(query=query, category=category, sort=sort, tag=tag)
+    page = search.page(cursor, per_page)
+    page.sort = search.sort
+    page.snippets = search.snippets
+    return page
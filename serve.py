@@ -0,0 +1,251 @@
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import configure_mappers
+from sqlalchemy.pool import QueuePool
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+import images
+import timeline
+from app import create_app
+from assets import assets
+from models import db
+from passwords import hasher
+from trending import trending
+from viewcounter import view_counter
+
+# Продакшен запуск без debug сервера: python serve.py [--workers N] [--threads M]
+# Мастер один раз собирает приложение, статику (static/dist) и шаблоны, открывает сокет
+# и форкает воркеров (copy-on-write - импорт и шаблоны общие). Каждый воркер
+# прогревает свой пул соединений и обслуживает запросы пулом потоков.
+# SIGTERM/SIGINT: воркеры перестают принимать соединения, дожидаются текущих
+# запросов и фоновых задач, сбрасывают просмотры и тренды в базу.
+# Упавший воркер мастер перезапускает. Только POSIX (fork).
+
+
+def log(message):
+    print(f'[{os.getpid()}] {message}', file=sys.stderr, flush=True)
+
+
+def warm_templates(app):
+    """Скомпилировать все шаблоны заранее - в воркерах они уже будут в кэше Jinja."""
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def warm_orm():
+    # Мапперы SQLAlchemy настраиваются при первом запросе - делаем это до fork, один раз на всех
+    configure_mappers()
+
+
+def check_database(app):
+    # До fork: падаем сразу, если база недоступна, и закрываем соединения мастера -
+    # сокеты, открытые до fork, нельзя делить между процессами
+    with app.app_context():
+        for engine in db.engines.values():
+            with engine.connect() as conn:
+                conn.exec_driver_sql('SELECT 1')
+            engine.dispose()
+
+
+def warm_pool(app, threads):
+    """Открыть в воркере столько соединений, сколько потоков (но не больше pool_size)."""
+    with app.app_context():
+        for engine in db.engines.values():
+            size = min(threads, engine.pool.size()) if isinstance(engine.pool, QueuePool) else 1
+            conns = [engine.connect() for _ in range(size)]
+            for conn in conns:
+                conn.exec_driver_sql('SELECT 1')
+                conn.close()
+
+
+def drain(app):
+    """Дописать всё, что процесс держит в памяти или в очередях."""
+    images.wait_pending()
+    timeline.wait_pending()
+    view_counter.flush()
+    trending.refresh()
+    # Пул bcrypt (spawn): дождаться дочерних процессов, иначе resource_tracker ругается на семафоры
+    hasher.shutdown()
+
+
+class _RequestHandler(WSGIRequestHandler):
+    # Без keep-alive: простаивающее соединение не занимает поток из пула
+    protocol_version = 'HTTP/1.0'
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Сервер werkzeug с фиксированным пулом потоков вместо потока на соединение.
+
+    Когда все потоки заняты, воркер не принимает новые соединения - их забирают другие воркеры.
+    """
+
+    multithread = True
+    multiprocess = True
+
+    def __init__(self, host, port, app, threads, fd):
+        super().__init__(host, port, app, handler=_RequestHandler, fd=fd)
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix='http')
+        self.slots = threading.BoundedSemaphore(threads)
+        self.master_pid = os.getppid()
+        self.stopping = False
+
+    def stop(self):
+        # shutdown() ждёт выхода из serve_forever, поэтому из отдельного потока
+        if not self.stopping:
+            self.stopping = True
+            threading.Thread(target=self.shutdown).start()
+
+    def service_actions(self):
+        # Вызывается в цикле serve_forever: мастер умер (kill -9) - не остаёмся сиротой
+        if os.getppid() != self.master_pid:
+            log('мастер завершился, останавливаемся')
+            self.stop()
+
+    def process_request(self, request, client_address):
+        self.slots.acquire()
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+
+def parse_bind(bind):
+    host, _, port = bind.rpartition(':')
+    return host.strip('[]') or '0.0.0.0', int(port)
+
+
+def open_socket(host, port):
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.create_server((host, port), family=family, backlog=2048)
+    # Неблокирующий accept: соединение, которое забрал другой воркер, не подвешивает этот
+    sock.setblocking(False)
+    return sock
+
+
+def run_worker(app, sock, host, port, threads):
+    server = PooledWSGIServer(host, port, app, threads, fd=sock.fileno())
+
+    def stop(signum, frame):
+        server.stop()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    warm_pool(app, threads)
+    log(f'воркер готов, потоков: {threads}')
+    try:
+        server.serve_forever()
+    finally:
+        server.pool.shutdown(wait=True)
+        server.server_close()
+        drain(app)
+    log('воркер остановлен')
+
+
+class Arbiter:
+    def __init__(self, app, sock, host, port, workers, threads, graceful_timeout):
+        self.app = app
+        self.sock = sock
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.threads = threads
+        self.graceful_timeout = graceful_timeout
+        self.children = {}
+        self.stopping = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+        code = 0
+        try:
+            run_worker(self.app, self.sock, self.host, self.port, self.threads)
+        except BaseException as e:
+            log(f'воркер упал: {e!r}')
+            code = 1
+        # Без atexit мастера: всё нужное воркер уже сбросил в drain()
+        os._exit(code)
+
+    def stop(self, signum, frame):
+        if self.stopping:
+            return
+        self.stopping = True
+        log(f'остановка, ждём воркеров до {self.graceful_timeout} с')
+        for pid in self.children:
+            os.kill(pid, signal.SIGTERM)
+        signal.alarm(self.graceful_timeout)
+
+    def kill(self, signum, frame):
+        for pid in self.children:
+            log(f'воркер {pid} не успел завершиться, SIGKILL')
+            os.kill(pid, signal.SIGKILL)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGALRM, self.kill)
+        for _ in range(self.workers):
+            self.spawn()
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if self.stopping or started is None:
+                continue
+            log(f'воркер {pid} завершился (код {os.waitstatus_to_exitcode(status)}), перезапуск')
+            # Воркер падает сразу после старта - не крутим fork в цикле
+            if time.monotonic() - started < 1:
+                time.sleep(1)
+            self.spawn()
+        signal.alarm(0)
+        self.sock.close()
+        log('сервер остановлен')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Продакшен сервер NewsWrite Pro (pre-fork).')
+    parser.add_argument('--config', default=os.environ.get('FLASK_CONFIG', 'production'),
+                        help='Конфиг из config.py (по умолчанию FLASK_CONFIG или production).')
+    parser.add_argument('--bind', help='host:port, по умолчанию SERVER_BIND.')
+    parser.add_argument('--workers', type=int, help='Процессов, по умолчанию SERVER_WORKERS.')
+    parser.add_argument('--threads', type=int, help='Потоков в процессе, по умолчанию SERVER_THREADS.')
+    args = parser.parse_args(argv)
+
+    app = create_app(args.config)
+    config = app.config
+    host, port = parse_bind(args.bind or config['SERVER_BIND'])
+    workers = max(1, args.workers or config['SERVER_WORKERS'])
+    threads = max(1, args.threads or config['SERVER_THREADS'])
+    if workers > 1 and config.get('PAGE_CACHE_TYPE') == 'lru':
+        log('PAGE_CACHE_TYPE=lru: у каждого воркера свой кэш и своя инвалидация, '
+            'для нескольких процессов используйте filesystem')
+
+    log(f'файлов статики: {len(assets.build())}')
+    log(f'шаблонов скомпилировано: {warm_templates(app)}')
+    warm_orm()
+    check_database(app)
+    sock = open_socket(host, port)
+    log(f'слушаем {host}:{sock.getsockname()[1]}, воркеров: {workers}')
+    Arbiter(app, sock, host, port, workers, threads, config['SERVER_GRACEFUL_TIMEOUT']).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, request
+from markupsafe import escape
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Учёт SQL запросов: сколько запросов и сколько времени в базе на каждый
+# HTTP запрос, плюс подозрения на N+1 (один и тот же SQL много раз подряд).
+# Включается через SQL_PROFILE; count_queries() работает всегда и нужен
+# для проверок вида "view_article делает не больше 5 запросов".
+
+_local = threading.local()
+
+
+class QueryStats:
+    def __init__(self, threshold=5):
+        self.threshold = threshold
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    @property
+    def suspects(self):
+        """Повторяющиеся запросы - вероятный N+1 (ленивые связи в цикле)."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= self.threshold]
+
+    def summary(self):
+        text = f'{self.count} queries, {self.duration * 1000:.1f} ms'
+        if self.suspects:
+            text += f', {len(self.suspects)} possible N+1'
+        return text
+
+
+def _active():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active():
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = _active()
+    if not stack or not conn.info.get('query_start'):
+        return
+    duration = time.perf_counter() - conn.info['query_start'].pop()
+    for stats in stack:
+        stats.record(statement, duration)
+
+
+@contextmanager
+def count_queries(threshold=5):
+    """with count_queries() as stats: ... ; assert stats.count <= 5"""
+    stats = QueryStats(threshold)
+    stack = _active()
+    stack.append(stats)
+    try:
+        yield stats
+    finally:
+        stack.remove(stats)
+
+
+def _render_panel(stats):
+    rows = ''.join(
+        f'<li><b>{n}×</b> <code>{escape(sql[:200])}</code></li>' for sql, n in stats.suspects
+    )
+    return (
+        '<div id="sql-profile" style="position:fixed;bottom:8px;right:8px;z-index:9999;'
+        'max-width:40rem;background:#111827;color:#e5e7eb;border:1px solid #4f46e5;'
+        'border-radius:8px;padding:8px 12px;font:12px monospace">'
+        f'SQL: {escape(stats.summary())}'
+        + (f'<ul style="margin-top:4px">{rows}</ul>' if rows else '')
+        + '</div>'
+    )
+
+
+def init_sql_profiler(app):
+    if not app.config.get('SQL_PROFILE'):
+        return
+    threshold = app.config.get('SQL_PROFILE_NPLUS1_THRESHOLD', 5)
+
+    @app.before_request
+    def _start_sql_profile():
+        g.sql_stats = QueryStats(threshold)
+        _active().append(g.sql_stats)
+
+    @app.after_request
+    def _finish_sql_profile(response):
+        stats = g.pop('sql_stats', None)
+        if stats is None:
+            return response
+        stack = _active()
+        if stats in stack:
+            stack.remove(stats)
+
+        response.headers['X-SQL-Queries'] = str(stats.count)
+        response.headers['X-SQL-Time'] = f'{stats.duration * 1000:.1f}ms'
+        log = app.logger.warning if stats.suspects else app.logger.info
+        log('SQL %s %s: %s', request.method, request.path, stats.summary())
+        for sql, n in stats.suspects:
+            app.logger.warning('  possible N+1 (%d×): %s', n, sql)
+
+        if (app.config.get('SQL_PROFILE_PANEL') and response.mimetype == 'text/html'
+                and not response.direct_passthrough):
+            body = response.get_data(as_text=True)
+            if '</body>' in body:
+                response.set_data(body.replace('</body>', _render_panel(stats) + '</body>', 1))
+        return response
+
+    @app.teardown_request
+    def _drop_sql_profile(exc):
+        # after_request не вызывается при необработанном исключении
+        stats = g.pop('sql_stats', None)
+        if stats is not None and stats in _active():
+            _active().remove(stats)
@@ -0,0 +1,21 @@
+import sqlalchemy as sa
+
+from models import db, ArticleModel
+
+# Статистика автора одним GROUP BY запросом, без загрузки самих статей
+
+
+def get_author_stats(author_id):
+    stmt = (
+        sa.select(ArticleModel.status, sa.func.count(ArticleModel.id), sa.func.sum(ArticleModel.views))
+        .where(ArticleModel.author_id == author_id)
+        .group_by(ArticleModel.status)
+    )
+    rows = db.session.execute(stmt).all()
+    counts = {status: count for status, count, _ in rows}
+    return {
+        'total_articles': sum(counts.values()),
+        'published_articles': counts.get('published', 0),
+        'draft_articles': counts.get('draft', 0),
+        'total_views': sum(views or 0 for _, _, views in rows),
+    }
@@ -0,0 +1,72 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from models import db
+from images import VARIANTS, variant_name
+
+# Хранилище загрузок по содержимому: файл называется sha256 от байтов,
+# одинаковые картинки хранятся один раз, а URL никогда не меняет содержимое
+# (можно кэшировать навсегда). Файл удаляется, когда на него не ссылается
+# ни одна статья и ни один пользователь.
+
+CHUNK_SIZE = 64 * 1024
+HASHED_NAME = re.compile(r'^[0-9a-f]{64}(_[a-z]+)?\.[a-z0-9]+$')
+# Одно расширение на формат: одинаковые байты как .jpg и .jpeg - один файл
+EXTENSION_ALIASES = {'jpeg': 'jpg'}
+
+
+def save_upload(file, folder, ext):
+    """Пишет загрузку на диск, считая хэш по ходу, и возвращает имя файла."""
+    digest = hashlib.sha256()
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+        ext = ext.lower()
+        filename = f'{digest.hexdigest()}.{EXTENSION_ALIASES.get(ext, ext)}'
+        path = os.path.join(folder, filename)
+        if os.path.exists(path):
+            os.remove(tmp)
+        else:
+            os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return filename
+
+
+def reference_count(column, filename):
+    """Сколько строк ссылаются на filename; column - UserModel.avatar или ArticleModel.articles_img
+    (у аватаров и картинок статей разные каталоги)."""
+    return db.session.execute(db.select(db.func.count()).where(column == filename)).scalar()
+
+
+def stem_reference_count(column, stem):
+    """Ссылки на <stem>.* с любым расширением - у них общие WebP копии (variant_name без расширения)."""
+    # Диапазон вместо LIKE, чтобы шёл по индексу: '/' - следующий символ после '.'
+    return db.session.execute(
+        db.select(db.func.count()).where(column >= stem + '.', column < stem + '/')
+    ).scalar()
+
+
+def release_upload(folder, filename, column):
+    """Удаляет файл и его WebP копии, если на них больше никто не ссылается. Вызывать после commit."""
+    if not filename or filename == 'default.png' or reference_count(column, filename):
+        return False
+    names = [filename]
+    if not stem_reference_count(column, filename.rsplit('.', 1)[0]):
+        names += [variant_name(filename, v) for v in VARIANTS]
+    for name in names:
+        try:
+            os.remove(os.path.join(folder, name))
+        except OSError:
+            pass
+    return True
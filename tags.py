@@ -0,0 +1,123 @@
+from collections import Counter
+
+from models import db, ArticleModel, TagModel, article_tags
+
+# Нормализованные теги: tags + article_tags вместо поиска подстрокой по
+# ArticleModel.tags. article_count (опубликованные статьи с тегом) меняется
+# на разницу при каждой правке статьи, а не пересчитывается целиком.
+
+MAX_TAG_LENGTH = 50
+
+
+def normalize_tag(name):
+    return ' '.join(name.strip().lstrip('#').lower().split())[:MAX_TAG_LENGTH]
+
+
+def parse_tags(value):
+    """'Python, flask,python' -> ['python', 'flask'] (порядок сохраняется, без повторов)."""
+    names = []
+    for part in (value or '').split(','):
+        name = normalize_tag(part)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def _get_or_create(names):
+    tags = {t.name: t for t in db.session.execute(
+        db.select(TagModel).where(TagModel.name.in_(names))
+    ).scalars()} if names else {}
+    for name in names:
+        if name not in tags:
+            tags[name] = TagModel(name=name)
+            db.session.add(tags[name])
+    return tags
+
+
+def _apply_counts(deltas):
+    rows = [{'b_id': tag.id, 'b_delta': delta} for tag, delta in deltas.items() if delta]
+    if not rows:
+        return
+    table = TagModel.__table__
+    db.session.execute(
+        table.update().where(table.c.id == db.bindparam('b_id'))
+        .values(article_count=table.c.article_count + db.bindparam('b_delta')),
+        rows,
+    )
+
+
+def update_article_tags(article, value, was_published=False):
+    """Привязать теги из строки value к статье и поправить счётчики.
+
+    Вызывать после того, как у статьи выставлен новый status;
+    was_published - была ли статья опубликована до правки.
+    """
+    names = parse_tags(value)
+    old_tags = list(article.tag_list)
+    tags = _get_or_create(names)
+    article.tags = ', '.join(names)
+    article.tag_list = [tags[name] for name in names]
+    db.session.flush()
+
+    deltas = Counter()
+    if was_published:
+        deltas.subtract(old_tags)
+    if article.status == 'published':
+        deltas.update(tags.values())
+    _apply_counts(deltas)
+
+
+def remove_article_tags(article):
+    """Вызывать перед удалением статьи."""
+    update_article_tags(article, '', was_published=article.status == 'published')
+
+
+def tag_filter(name):
+    """Условие для WHERE: статья с тегом name (через индекс article_tags)."""
+    return ArticleModel.id.in_(
+        db.select(article_tags.c.article_id)
+        .join(TagModel, TagModel.id == article_tags.c.tag_id)
+        .where(TagModel.name == normalize_tag(name))
+    )
+
+
+def popular_tags(limit=50):
+    return db.session.execute(
+        db.select(TagModel).where(TagModel.article_count > 0)
+        .order_by(TagModel.article_count.desc()).limit(limit)
+    ).scalars().all()
+
+
+def rebuild_tags(batch_size=1000):
+    """Заново разобрать строки tags всех статей (после bulk импорта и т.п.)."""
+    db.session.execute(article_tags.delete())
+    tag_ids = dict(db.session.execute(db.select(TagModel.name, TagModel.id)).all())
+    table = TagModel.__table__
+    links = []
+
+    def flush_links():
+        if links:
+            db.session.execute(article_tags.insert(), links)
+            links.clear()
+
+    result = db.session.execute(
+        db.select(ArticleModel.id, ArticleModel.tags).execution_options(yield_per=batch_size)
+    )
+    for article_id, value in result:
+        for name in parse_tags(value):
+            if name not in tag_ids:
+                tag_ids[name] = db.session.execute(table.insert().values(name=name)).inserted_primary_key[0]
+            links.append({'article_id': article_id, 'tag_id': tag_ids[name]})
+        if len(links) >= batch_size:
+            flush_links()
+    flush_links()
+
+    published = (
+        db.select(db.func.count())
+        .select_from(article_tags.join(ArticleModel, ArticleModel.id == article_tags.c.article_id))
+        .where(article_tags.c.tag_id == table.c.id, ArticleModel.status == 'published')
+        .scalar_subquery()
+    )
+    db.session.execute(table.update().values(article_count=published))
+    db.session.commit()
+    return len(tag_ids)
@@ -0,0 +1,198 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import defer, joinedload
+
+from cursors import keyset_paginate
+from models import db, ArticleModel, FollowModel, TimelineEntryModel, UserModel
+from pagecache import page_cache
+
+# Подписки на авторов и домашняя лента с fan-out при записи: когда статья
+# публикуется, фоновый поток пачками раскладывает её в timeline_entries
+# каждого подписчика. Чтение ленты - один диапазон по (user_id, created_at).
+# Авторов с подписчиками больше TIMELINE_FANOUT_LIMIT не раскладываем -
+# их статьи подмешиваются при чтении (pull), иначе одна публикация
+# превращалась бы в миллионы вставок.
+
+BACKFILL_ON_FOLLOW = 20
+
+_executor = None
+
+
+def _get_executor(app):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=app.config.get('TIMELINE_WORKERS', 1),
+                                       thread_name_prefix='timeline')
+    return _executor
+
+
+def wait_pending():
+    """Дождаться поставленных в очередь задач раскладки по лентам (при остановке процесса)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def _submit(app, fn, *args):
+    if app.config.get('TIMELINE_WORKERS', 1) <= 0:
+        _run(app, fn, *args)
+    else:
+        _get_executor(app).submit(_run, app, fn, *args)
+
+
+def _run(app, fn, *args):
+    with app.app_context():
+        try:
+            fn(app, *args)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.warning('Ошибка при обновлении лент: %s', e)
+
+
+def _is_pulled(app, follower_count):
+    return follower_count > app.config.get('TIMELINE_FANOUT_LIMIT', 10000)
+
+
+def _fanout(app, article_id):
+    article = db.session.execute(
+        db.select(ArticleModel.id, ArticleModel.author_id, ArticleModel.created_at, ArticleModel.status,
+                  UserModel.follower_count)
+        .join(UserModel, UserModel.id == ArticleModel.author_id)
+        .where(ArticleModel.id == article_id)
+    ).first()
+    _retract(app, article_id)
+    if article is None or article.status != 'published' or _is_pulled(app, article.follower_count):
+        return
+
+    batch_size = app.config.get('TIMELINE_BATCH', 1000)
+    last_id = 0
+    while True:
+        # Подписчики автора по индексу (author_id, follower_id), пачками по keyset
+        followers = db.session.execute(
+            db.select(FollowModel.follower_id)
+            .where(FollowModel.author_id == article.author_id, FollowModel.follower_id > last_id)
+            .order_by(FollowModel.follower_id).limit(batch_size)
+        ).scalars().all()
+        if not followers:
+            break
+        db.session.execute(db.insert(TimelineEntryModel), [
+            {'user_id': follower_id, 'article_id': article.id,
+             'author_id': article.author_id, 'created_at': article.created_at}
+            for follower_id in followers
+        ])
+        db.session.commit()
+        last_id = followers[-1]
+    page_cache.invalidate('listings')
+
+
+def _retract(app, article_id):
+    db.session.execute(db.delete(TimelineEntryModel).where(TimelineEntryModel.article_id == article_id))
+    db.session.commit()
+
+
+def _backfill(app, user_id, author_id):
+    articles = db.session.execute(
+        db.select(ArticleModel.id, ArticleModel.created_at)
+        .filter_by(author_id=author_id, status='published')
+        .order_by(ArticleModel.created_at.desc(), ArticleModel.id.desc())
+        .limit(BACKFILL_ON_FOLLOW)
+    ).all()
+    db.session.execute(db.delete(TimelineEntryModel).where(
+        TimelineEntryModel.user_id == user_id, TimelineEntryModel.author_id == author_id
+    ))
+    if articles:
+        db.session.execute(db.insert(TimelineEntryModel), [
+            {'user_id': user_id, 'article_id': a.id, 'author_id': author_id, 'created_at': a.created_at}
+            for a in articles
+        ])
+    db.session.commit()
+    page_cache.invalidate('users')
+
+
+def _drop_author(app, user_id, author_id):
+    db.session.execute(db.delete(TimelineEntryModel).where(
+        TimelineEntryModel.user_id == user_id, TimelineEntryModel.author_id == author_id
+    ))
+    db.session.commit()
+    page_cache.invalidate('users')
+
+
+def article_published(app, article_id):
+    """Вызывать после commit, когда статья стала опубликованной."""
+    _submit(app, _fanout, article_id)
+
+
+def article_withdrawn(app, article_id):
+    """Вызывать после commit, когда статью сняли с публикации или удалили."""
+    _submit(app, _retract, article_id)
+
+
+def is_following(follower_id, author_id):
+    if not follower_id:
+        return False
+    return db.session.get(FollowModel, (follower_id, author_id)) is not None
+
+
+def follow(app, follower_id, author_id):
+    """Возвращает False, если подписка уже была (или это сам автор)."""
+    if follower_id == author_id or is_following(follower_id, author_id):
+        return False
+    db.session.add(FollowModel(follower_id=follower_id, author_id=author_id))
+    db.session.execute(db.update(UserModel).where(UserModel.id == author_id)
+                       .values(follower_count=UserModel.follower_count + 1))
+    db.session.commit()
+    author = db.session.get(UserModel, author_id)
+    if not _is_pulled(app, author.follower_count):
+        _submit(app, _backfill, follower_id, author_id)
+    return True
+
+
+def unfollow(app, follower_id, author_id):
+    result = db.session.execute(db.delete(FollowModel).where(
+        FollowModel.follower_id == follower_id, FollowModel.author_id == author_id
+    ))
+    if not result.rowcount:
+        db.session.rollback()
+        return False
+    db.session.execute(db.update(UserModel).where(UserModel.id == author_id)
+                       .values(follower_count=UserModel.follower_count - 1))
+    db.session.commit()
+    _submit(app, _drop_author, follower_id, author_id)
+    return True
+
+
+def following_count(user_id):
+    return db.session.execute(
+        db.select(db.func.count()).select_from(FollowModel).where(FollowModel.follower_id == user_id)
+    ).scalar()
+
+
+def home_timeline(app, user_id, cursor=None, per_page=20):
+    """Страница домашней ленты: разложенные записи плюс статьи "больших" авторов."""
+    limit = app.config.get('TIMELINE_FANOUT_LIMIT', 10000)
+    pulled = db.session.execute(
+        db.select(FollowModel.author_id)
+        .join(UserModel, UserModel.id == FollowModel.author_id)
+        .where(FollowModel.follower_id == user_id, UserModel.follower_count > limit)
+    ).scalars().all()
+
+    options = (defer(ArticleModel.content), joinedload(ArticleModel.author))
+    if not pulled:
+        stmt = (
+            db.select(ArticleModel)
+            .join(TimelineEntryModel, TimelineEntryModel.article_id == ArticleModel.id)
+            .options(*options)
+            .where(TimelineEntryModel.user_id == user_id, ArticleModel.status == 'published')
+        )
+        return keyset_paginate(stmt, [TimelineEntryModel.created_at, TimelineEntryModel.article_id],
+                               cursor, per_page)
+
+    pushed = db.select(TimelineEntryModel.article_id).where(TimelineEntryModel.user_id == user_id)
+    stmt = (
+        db.select(ArticleModel)
+        .options(*options)
+        .where(ArticleModel.status == 'published',
+               db.or_(ArticleModel.id.in_(pushed), ArticleModel.author_id.in_(pulled)))
+    )
+    return keyset_paginate(stmt, [ArticleModel.created_at, ArticleModel.id], cursor, per_page)
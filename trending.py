@@ -0,0 +1,202 @@
+import atexit
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.orm import defer, joinedload
+
+from cursors import keyset_paginate
+from models import db, ArticleModel, ArticleScoreModel, CommentModel, LikeModel
+from pagecache import page_cache
+
+# Лента "В тренде". Каждое событие (публикация, лайк, комментарий, просмотр)
+# весит weight * 2^((t - EPOCH) / half_life): свежие события весят больше,
+# а хранимые оценки не нужно пересчитывать со временем - порядок статей, которых
+# никто не трогал, не меняется. Храним log2 суммы, чтобы не переполнить float.
+# Оценки лежат в article_scores; фоновый поток пересчитывает только статьи,
+# отмеченные touch() с прошлого прохода. Запрос страницы - чтение по индексу.
+# Пересчёт инкрементальный: в article_scores запомнены сумма по событиям и id
+# последних учтённых лайка и комментария, домешиваются только новые. После
+# удалений (touch(rescan=True)) и в refresh(full=True) события читаются с начала.
+
+EPOCH = datetime(2025, 1, 1)
+CHUNK = 500
+# Условий (article_id = ? AND id > ?) в одном запросе новых событий
+OR_BATCH = 100
+
+
+def _log2_sum(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    top = max(values)
+    return top + math.log2(sum(2 ** (v - top) for v in values))
+
+
+class TrendingFeed:
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._touched = set()
+        self._rescan = set()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('TRENDING_HALF_LIFE_HOURS', 24)
+        # 0 - пересчитывать сразу в touch() (тесты)
+        app.config.setdefault('TRENDING_REFRESH_INTERVAL', 60)
+        app.config.setdefault('TRENDING_WEIGHTS', {'article': 1.0, 'like': 3.0, 'comment': 5.0, 'view': 0.2})
+        atexit.register(self.refresh)
+
+    def _weight(self, when, weight):
+        half_life = self.app.config['TRENDING_HALF_LIFE_HOURS'] * 3600
+        return (when - EPOCH).total_seconds() / half_life + math.log2(weight)
+
+    def touch(self, *article_ids, rescan=False):
+        """Отметить статьи для пересчёта; rescan=True - что-то удалено (лайк, комментарий),
+        оценку нужно собрать заново, а не дополнить."""
+        with self._lock:
+            self._touched.update(article_ids)
+            if rescan:
+                self._rescan.update(article_ids)
+            if self.app.config['TRENDING_REFRESH_INTERVAL']:
+                self._ensure_refresher()
+                return
+        self.refresh()
+
+    def _ensure_refresher(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='trending-refresher', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        with self.app.app_context():
+            empty = db.session.execute(db.select(ArticleScoreModel.article_id).limit(1)).first() is None
+            db.session.remove()
+        # Первый запуск на пустой таблице - считаем всё
+        if empty:
+            self.refresh(full=True)
+        while True:
+            time.sleep(self.app.config['TRENDING_REFRESH_INTERVAL'])
+            self.refresh()
+
+    def refresh(self, full=False):
+        """Пересчитать отмеченные статьи (full - все опубликованные), вернуть их число."""
+        with self._lock:
+            touched, self._touched = self._touched, set()
+            rescan, self._rescan = self._rescan, set()
+        if self.app is None or (not full and not touched):
+            return 0
+        try:
+            with self.app.app_context():
+                count = self._recompute(None if full else touched, rescan)
+                db.session.remove()
+        except Exception as e:
+            with self._lock:
+                self._touched.update(touched)
+                self._rescan.update(rescan)
+            self.app.logger.warning('Не удалось пересчитать тренды: %s', e)
+            return 0
+        page_cache.invalidate('trending')
+        return count
+
+    def _recompute(self, ids, rescan):
+        if ids is None:
+            ids = db.session.execute(db.select(ArticleModel.id).filter_by(status='published')).scalars().all()
+            rescan = set(ids)
+            # Снятые с публикации и удалённые
+            db.session.execute(db.delete(ArticleScoreModel).where(
+                ArticleScoreModel.article_id.not_in(db.select(ArticleModel.id).filter_by(status='published'))
+            ))
+        ids = sorted(ids)
+        for i in range(0, len(ids), CHUNK):
+            self._recompute_chunk(ids[i:i + CHUNK], rescan)
+            db.session.commit()
+        return len(ids)
+
+    def _new_events(self, model, since):
+        """(article_id, id, created_at) событий model с id больше since[article_id]."""
+        items = sorted(since.items())
+        for i in range(0, len(items), OR_BATCH):
+            yield from db.session.execute(
+                db.select(model.article_id, model.id, model.created_at).where(db.or_(*[
+                    db.and_(model.article_id == article_id, model.id > last_id)
+                    for article_id, last_id in items[i:i + OR_BATCH]
+                ]))
+            )
+
+    def _recompute_chunk(self, ids, rescan):
+        weights = self.app.config['TRENDING_WEIGHTS']
+        articles = db.session.execute(
+            db.select(ArticleModel.id, ArticleModel.created_at, ArticleModel.views)
+            .where(ArticleModel.id.in_(ids), ArticleModel.status == 'published')
+        ).all()
+        previous = {row.article_id: row for row in db.session.execute(
+            db.select(ArticleScoreModel.article_id, ArticleScoreModel.event_score,
+                      ArticleScoreModel.last_like_id, ArticleScoreModel.last_comment_id,
+                      ArticleScoreModel.view_score, ArticleScoreModel.views_seen)
+            .where(ArticleScoreModel.article_id.in_(ids))
+        )}
+        events, seen = {}, {LikeModel: {}, CommentModel: {}}
+        for article in articles:
+            old = previous.get(article.id)
+            if old is None or old.event_score is None or article.id in rescan:
+                events[article.id] = [self._weight(article.created_at, weights['article'])]
+                seen[LikeModel][article.id] = seen[CommentModel][article.id] = 0
+            else:
+                events[article.id] = [old.event_score]
+                seen[LikeModel][article.id] = old.last_like_id
+                seen[CommentModel][article.id] = old.last_comment_id
+        for model, kind in ((LikeModel, 'like'), (CommentModel, 'comment')):
+            last = seen[model]
+            for article_id, event_id, created_at in self._new_events(model, last):
+                events[article_id].append(self._weight(created_at, weights[kind]))
+                last[article_id] = max(last[article_id], event_id)
+
+        now = datetime.utcnow()
+        rows = []
+        for article in articles:
+            old = previous.get(article.id)
+            if old is None:
+                # Просмотры, набранные до первого расчёта, относим ко времени публикации
+                view_score = self._weight(article.created_at, weights['view'] * article.views) if article.views else None
+            else:
+                view_score = old.view_score
+                new_views = article.views - old.views_seen
+                if new_views > 0:
+                    view_score = _log2_sum([view_score, self._weight(now, weights['view'] * new_views)])
+            event_score = _log2_sum(events[article.id])
+            rows.append({
+                'article_id': article.id,
+                'score': _log2_sum([event_score, view_score]),
+                'event_score': event_score,
+                'last_like_id': seen[LikeModel][article.id],
+                'last_comment_id': seen[CommentModel][article.id],
+                'view_score': view_score,
+                'views_seen': article.views,
+                'computed_at': now,
+            })
+
+        db.session.execute(db.delete(ArticleScoreModel).where(ArticleScoreModel.article_id.in_(ids)))
+        if rows:
+            db.session.execute(db.insert(ArticleScoreModel), rows)
+
+
+trending = TrendingFeed()
+
+
+def trending_articles(cursor=None, per_page=20):
+    """Страница ленты из снимка article_scores."""
+    stmt = (
+        db.select(ArticleModel)
+        .join(ArticleScoreModel, ArticleScoreModel.article_id == ArticleModel.id)
+        .options(defer(ArticleModel.content), joinedload(ArticleModel.author))
+        .where(ArticleModel.status == 'published')
+    )
+    return keyset_paginate(stmt, [ArticleScoreModel.score, ArticleScoreModel.article_id], cursor, per_page)
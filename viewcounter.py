@@ -0,0 +1,113 @@
+import atexit
+import os
+import secrets
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from flask import session
+from sqlalchemy import bindparam
+
+from models import db, ArticleModel
+from trending import trending
+
+# Счётчик просмотров с отложенной записью: просмотры копятся в памяти
+# процесса и раз в VIEW_FLUSH_INTERVAL секунд (или при VIEW_FLUSH_THRESHOLD
+# накопленных) уходят в базу одним пакетным UPDATE. Запись на каждый
+# просмотр в SQLite выстроила бы все чтения в очередь за блокировкой записи.
+
+
+class ViewCounter:
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._seen = {}
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('VIEW_FLUSH_INTERVAL', 10)
+        app.config.setdefault('VIEW_FLUSH_THRESHOLD', 500)
+        app.config.setdefault('VIEW_DEDUP_WINDOW', 30 * 60)
+        atexit.register(self.flush)
+
+    def _viewer(self):
+        if 'user_id' in session:
+            return f"u{session['user_id']}"
+        if 'vid' not in session:
+            session['vid'] = secrets.token_hex(8)
+        return session['vid']
+
+    def _ensure_flusher(self):
+        # Поток свой в каждом процессе (после fork старого потока нет)
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='view-flusher', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.app.config['VIEW_FLUSH_INTERVAL'])
+            self.flush()
+
+    def record(self, article_id):
+        config = self.app.config
+        key = (self._viewer(), article_id)
+        now = time.time()
+        with self._lock:
+            self._ensure_flusher()
+            # Один и тот же зритель в пределах окна считается один раз
+            if now - self._seen.get(key, 0) < config['VIEW_DEDUP_WINDOW']:
+                return
+            self._seen[key] = now
+            self._pending[article_id] += 1
+            flush_now = sum(self._pending.values()) >= config['VIEW_FLUSH_THRESHOLD']
+        if flush_now:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            window = self.app.config['VIEW_DEDUP_WINDOW'] if self.app else 0
+            cutoff = time.time() - window
+            self._seen = {k: t for k, t in self._seen.items() if t >= cutoff}
+        if not pending or self.app is None:
+            return 0
+
+        table = ArticleModel.__table__
+        stmt = (
+            table.update()
+            .where(table.c.id == bindparam('b_id'))
+            .values(views=table.c.views + bindparam('b_n'), updated_at=table.c.updated_at)
+        )
+        rows = [{'b_id': article_id, 'b_n': n} for article_id, n in pending.items()]
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as conn:
+                    conn.execute(stmt, rows)
+        except Exception as e:
+            # Не потеряли - вернём в очередь до следующей попытки
+            with self._lock:
+                self._pending.update(pending)
+            self.app.logger.warning('Не удалось записать просмотры: %s', e)
+            return 0
+        trending.touch(*pending)
+        return len(rows)
+
+
+view_counter = ViewCounter()
+
+
+def counts_view(f):
+    """Считает просмотр статьи (kwarg id), в том числе когда ответ отдан из кэша."""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        response = f(*args, **kwargs)
+        if getattr(response, 'status_code', 200) in (200, 304):
+            view_counter.record(kwargs['id'])
+        return response
+    return wrapper